@@ -0,0 +1,78 @@
+import sys
+
+sys.path.append(r"R:\pipeline\networkInstall\arnold\SDK\Arnold-7.1.4.2-windows")
+from arnold import *
+
+
+# ######################################################################################################################
+
+class ArnoldSession:
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.__owns_arnold = False
+        self.__universe = None
+
+    def is_active(self):
+        """
+        Getter of whether Arnold is currently running
+        :return: is active
+        """
+        return AiArnoldIsActive()
+
+    def get_universe(self):
+        """
+        Getter of the universe currently loaded
+        :return: universe
+        """
+        return self.__universe
+
+    def begin(self):
+        """
+        Start Arnold if it isn't running yet. If it was started by someone else (MtoA for instance) we reuse it and
+        won't shut it down at the end
+        :return:
+        """
+        if AiArnoldIsActive(): return
+        AiBegin(AI_SESSION_BATCH)
+        self.__owns_arnold = True
+
+    def end(self):
+        """
+        Destroy the universe loaded and shut Arnold down if we started it
+        :return:
+        """
+        self.destroy_universe()
+        if self.__owns_arnold and AiArnoldIsActive():
+            AiEnd()
+        self.__owns_arnold = False
+
+    def load(self, ass_path, mask=AI_NODE_SHAPE):
+        """
+        Load an ASS file in a dedicated universe, keeping only the nodes of the given type mask
+        :param ass_path
+        :param mask: node types to load
+        :return: universe loaded or None if it failed
+        """
+        self.begin()
+        self.destroy_universe()
+        universe = AiUniverse()
+        params = AiParamValueMap()
+        AiParamValueMapSetInt(params, "mask", mask)
+        loaded = AiSceneLoad(universe, ass_path, params)
+        AiParamValueMapDestroy(params)
+        if not loaded:
+            AiUniverseDestroy(universe)
+            return None
+        self.__universe = universe
+        return universe
+
+    def destroy_universe(self):
+        """
+        Destroy the universe loaded without touching the Arnold session
+        :return:
+        """
+        if self.__universe is None: return
+        AiUniverseDestroy(self.__universe)
+        self.__universe = None
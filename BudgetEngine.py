@@ -0,0 +1,238 @@
+import re
+import json
+
+import numpy as np
+
+# ######################################################################################################################
+
+# Rough memory used by Arnold for a polygon once tessellated (vertices, indices, normals and uvs)
+BYTES_PER_POLYGON = 60
+
+METRICS = ["polygons", "subdiv_polygons", "dist_poly", "memory"]
+LEVELS = ["leaf", "branch"]
+MATCHES = ["glob", "regex"]
+
+
+# ######################################################################################################################
+
+def glob_to_regex(pattern):
+    """
+    Translate a glob on the paths to a regex. * and ? stay in one level of the path while ** matches any depth
+    :param pattern
+    :return: regex pattern
+    """
+    regex = ""
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("/**", index) and (index + 3 == len(pattern) or pattern[index + 3] == "/"):
+            # /** matches the path itself and all its descendants
+            regex += "(/.*)?"
+            index += 3
+        elif pattern.startswith("**", index):
+            regex += ".*"
+            index += 2
+        elif char == "*":
+            # A whole level can't be empty, so /* doesn't match the root
+            whole_level = pattern[index - 1:index] == "/" and pattern[index + 1:index + 2] in ("", "/")
+            regex += "[^/]+" if whole_level else "[^/]*"
+            index += 1
+        elif char == "?":
+            regex += "[^/]"
+            index += 1
+        elif char == "[" and "]" in pattern[index + 2:]:
+            end = pattern.index("]", index + 2)
+            content = pattern[index + 1:end]
+            regex += "[^/" + content[1:] + "]" if content.startswith("!") else "[" + content + "]"
+            index = end + 1
+        else:
+            regex += re.escape(char)
+            index += 1
+    return "(?s:" + regex + ")\\Z"
+
+
+# ######################################################################################################################
+
+class BudgetRule:
+    def __init__(self, name, pattern, metric, limit, level="leaf", match="glob"):
+        """
+        Constructor
+        :param name
+        :param pattern: pattern of the paths concerned
+        :param metric: one of METRICS
+        :param limit: max value allowed
+        :param level: one of LEVELS
+        :param match: one of MATCHES
+        """
+        if metric not in METRICS:
+            raise ValueError("Unknown metric \"" + str(metric) + "\" in the budget rule " + name)
+        if level not in LEVELS:
+            raise ValueError("Unknown level \"" + str(level) + "\" in the budget rule " + name)
+        if match not in MATCHES:
+            raise ValueError("Unknown match \"" + str(match) + "\" in the budget rule " + name)
+        self.__name = name
+        self.__pattern = pattern
+        self.__metric = metric
+        self.__limit = limit
+        self.__level = level
+        self.__regex = re.compile(glob_to_regex(pattern) if match == "glob" else pattern)
+
+    def get_name(self):
+        """
+        Getter of the name
+        :return: name
+        """
+        return self.__name
+
+    def get_pattern(self):
+        """
+        Getter of the pattern
+        :return: pattern
+        """
+        return self.__pattern
+
+    def get_metric(self):
+        """
+        Getter of the metric
+        :return: metric
+        """
+        return self.__metric
+
+    def get_limit(self):
+        """
+        Getter of the limit
+        :return: limit
+        """
+        return self.__limit
+
+    def get_level(self):
+        """
+        Getter of the level
+        :return: level
+        """
+        return self.__level
+
+    def match(self, path):
+        """
+        Check whether the path is concerned by the rule
+        :param path
+        :return: matches
+        """
+        return self.__regex.match(path) is not None
+
+
+class BudgetEngine:
+    @staticmethod
+    def load(config_path):
+        """
+        Create an engine from a JSON config file :
+        {"rules": [{"name": "props", "pattern": "/*/props/*", "metric": "polygons", "max": 50000, "level": "leaf"}]}
+        :param config_path
+        :return: budget engine
+        """
+        with open(config_path, "r") as config_file:
+            config = json.load(config_file)
+        rules = []
+        for index, rule_data in enumerate(config.get("rules", [])):
+            name = rule_data.get("name", "rule_" + str(index))
+            if "pattern" not in rule_data or "metric" not in rule_data or "max" not in rule_data:
+                raise ValueError("The budget rule " + name + " needs a pattern, a metric and a max")
+            rules.append(BudgetRule(name, rule_data["pattern"], rule_data["metric"], rule_data["max"],
+                                    rule_data.get("level", "leaf"), rule_data.get("match", "glob")))
+        return BudgetEngine(rules)
+
+    @staticmethod
+    def compute_branches(paths):
+        """
+        Compute every branch of the given leaf paths and the link between each leaf and its branches
+        :param paths: leaf paths
+        :return: branch paths, leaf indices, branch indices (one pair per link)
+        """
+        branch_paths = ["/"]
+        branch_index = {"/": 0}
+        leaf_indices = []
+        branch_indices = []
+        for leaf_index, path in enumerate(paths):
+            keys = path.split("/")[1:-1]
+            leaf_indices.append(leaf_index)
+            branch_indices.append(0)
+            branch_path = ""
+            for key in keys:
+                branch_path += "/" + key
+                index = branch_index.get(branch_path)
+                if index is None:
+                    index = len(branch_paths)
+                    branch_index[branch_path] = index
+                    branch_paths.append(branch_path)
+                leaf_indices.append(leaf_index)
+                branch_indices.append(index)
+        return branch_paths, np.array(leaf_indices, dtype=np.int64), np.array(branch_indices, dtype=np.int64)
+
+    def __init__(self, rules):
+        """
+        Constructor
+        :param rules
+        """
+        self.__rules = rules
+
+    def get_rules(self):
+        """
+        Getter of the rules
+        :return: rules
+        """
+        return self.__rules
+
+    def evaluate(self, paths, columns):
+        """
+        Evaluate all the rules over the whole result
+        :param paths: leaf paths
+        :param columns: dict of each metric to an array of the values of the leaves (NaN if unknown)
+        :return: verdict
+        """
+        nb_leaves = len(paths)
+        leaf_values = np.zeros((len(METRICS), nb_leaves), dtype=np.float64)
+        for metric_index, metric in enumerate(METRICS):
+            leaf_values[metric_index] = np.asarray(columns[metric], dtype=np.float64)
+
+        levels = {"leaf": (list(paths), leaf_values)}
+        if any(rule.get_level() == "branch" for rule in self.__rules):
+            branch_paths, leaf_indices, branch_indices = BudgetEngine.compute_branches(paths)
+            branch_values = np.zeros((len(METRICS), len(branch_paths)), dtype=np.float64)
+            summable_values = np.nan_to_num(leaf_values)
+            for metric_index in range(len(METRICS)):
+                branch_values[metric_index] = np.bincount(branch_indices, weights=summable_values[metric_index][
+                    leaf_indices], minlength=len(branch_paths))
+            levels["branch"] = (branch_paths, branch_values)
+
+        violations = []
+        for rule in self.__rules:
+            level_paths, values = levels[rule.get_level()]
+            matches = np.fromiter((rule.match(path) for path in level_paths), dtype=bool, count=len(level_paths))
+            rule_values = values[METRICS.index(rule.get_metric())]
+            with np.errstate(invalid="ignore"):
+                exceeded = np.nonzero(matches & (rule_values > rule.get_limit()))[0]
+            for index in exceeded:
+                violations.append({
+                    "rule": rule.get_name(),
+                    "path": level_paths[index],
+                    "level": rule.get_level(),
+                    "metric": rule.get_metric(),
+                    "value": float(rule_values[index]),
+                    "limit": rule.get_limit()
+                })
+        return {
+            "passed": len(violations) == 0,
+            "nb_rules": len(self.__rules),
+            "violations": violations
+        }
+
+    @staticmethod
+    def write_verdict(verdict, verdict_path):
+        """
+        Write the verdict in a JSON file
+        :param verdict
+        :param verdict_path
+        :return:
+        """
+        with open(verdict_path, "w") as verdict_file:
+            json.dump(verdict, verdict_file, indent=4)
@@ -0,0 +1,183 @@
+import numpy as np
+import pymel.core as pm
+
+# ######################################################################################################################
+
+_INCH_TO_MM = 25.4
+
+# Position of a bounding box relative to the camera frustum
+FRUSTUM_UNKNOWN = -1
+FRUSTUM_INSIDE = 0
+FRUSTUM_PARTIAL = 1
+FRUSTUM_OUTSIDE = 2
+FRUSTUM_NAMES = {FRUSTUM_INSIDE: "In frustum", FRUSTUM_PARTIAL: "Partial", FRUSTUM_OUTSIDE: "Outside"}
+# Corners of a bounding box as indices in (min x, min y, min z, max x, max y, max z)
+_BBOX_CORNERS = np.array([[x, y, z] for x in (0, 3) for y in (1, 4) for z in (2, 5)])
+
+
+# ######################################################################################################################
+
+def get_render_camera():
+    """
+    Get the first renderable camera of the scene
+    :return: camera shape (None if there is none)
+    """
+    for camera in pm.ls(cameras=True):
+        if pm.getAttr(camera + '.renderable'):
+            return camera
+    return None
+
+
+def get_render_resolution():
+    """
+    Get the resolution of the render
+    :return: width, height
+    """
+    resolution = pm.PyNode("defaultResolution")
+    return resolution.width.get(), resolution.height.get()
+
+
+def get_view_projection(camera, width, height):
+    """
+    Compute the view projection matrix of a camera for a resolution. Matrices are in Maya row vector convention
+    (point * matrix) and Maya cameras look down -Z. The film back is squeezed by the lens squeeze ratio, scaled by the
+    camera scale and shifted by the film offsets. The overscan only changes the viewport and isn't rendered
+    :param camera: camera shape
+    :param width
+    :param height
+    :return: 4x4 view projection matrix
+    """
+    world_matrix = np.array(camera.getTransform().worldMatrix.get(), dtype=np.float64).reshape(4, 4)
+    view = np.linalg.inv(world_matrix)
+
+    orthographic = camera.isOrtho()
+    film_width = camera.getHorizontalFilmAperture() * camera.lensSqueezeRatio.get() * _INCH_TO_MM
+    film_height = camera.getVerticalFilmAperture() * _INCH_TO_MM
+    image_aspect = width / height
+    film_aspect = film_width / film_height
+    # Film fit : 0 Fill, 1 Horizontal, 2 Vertical, 3 Overscan
+    film_fit = camera.filmFit.get()
+    if film_fit == 0:
+        fit_horizontal = film_aspect <= image_aspect
+    elif film_fit == 3:
+        fit_horizontal = film_aspect > image_aspect
+    else:
+        fit_horizontal = film_fit == 1
+    # Size of the film back seen by the render
+    if fit_horizontal:
+        view_film_width = film_width
+        view_film_height = film_width / image_aspect
+    else:
+        view_film_width = film_height * image_aspect
+        view_film_height = film_height
+    camera_scale = camera.cameraScale.get()
+    if orthographic:
+        # The orthographic width covers the horizontal film aperture
+        scale_x = 2 / (camera.getOrthoWidth() * camera_scale * view_film_width / film_width)
+    else:
+        scale_x = 2 * camera.getFocalLength() / (view_film_width * camera_scale)
+    scale_y = scale_x * image_aspect
+    offset_x = 2 * camera.getHorizontalFilmOffset() * _INCH_TO_MM / view_film_width
+    offset_y = 2 * camera.getVerticalFilmOffset() * _INCH_TO_MM / view_film_height
+
+    near = camera.getNearClipPlane()
+    far = camera.getFarClipPlane()
+    projection = np.zeros((4, 4), dtype=np.float64)
+    projection[0, 0] = scale_x
+    projection[1, 1] = scale_y
+    if orthographic:
+        projection[2, 2] = 2 / (near - far)
+        projection[3, 0] = -offset_x
+        projection[3, 1] = -offset_y
+        projection[3, 2] = (far + near) / (near - far)
+        projection[3, 3] = 1
+    else:
+        projection[2, 0] = offset_x
+        projection[2, 1] = offset_y
+        projection[2, 2] = (far + near) / (near - far)
+        projection[2, 3] = -1
+        projection[3, 2] = 2 * far * near / (near - far)
+    return view @ projection
+
+
+def project_bounding_boxes(bboxes, view_projection):
+    """
+    Project the 8 corners of every bounding box in clip space
+    :param bboxes: array (N, 6) of world bounding boxes
+    :param view_projection
+    :return: array (N, 8, 4) of the corners in clip space
+    """
+    corners = bboxes[:, _BBOX_CORNERS]
+    corners = np.concatenate([corners, np.ones(corners.shape[:2] + (1,))], axis=2)
+    return corners @ view_projection
+
+
+def compute_screen_areas(clip_corners, width, height):
+    """
+    Compute the area in pixels covered by the screen rectangle of every projected bounding box. A box crossing the
+    camera plane is considered covering the whole screen and a box fully behind the camera covers nothing
+    :param clip_corners: array (N, 8, 4)
+    :param width
+    :param height
+    :return: array (N) of areas (NaN for unknown bounding boxes)
+    """
+    w = clip_corners[:, :, 3]
+    in_front = w > 1e-6
+    all_in_front = in_front.all(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ndc = clip_corners[:, :, :2] / np.where(in_front, w, 1)[:, :, None]
+    ndc_min = np.clip(ndc.min(axis=1), -1, 1)
+    ndc_max = np.clip(ndc.max(axis=1), -1, 1)
+    areas = (ndc_max[:, 0] - ndc_min[:, 0]) * width / 2 * (ndc_max[:, 1] - ndc_min[:, 1]) * height / 2
+    areas = np.where(all_in_front, areas, np.where(in_front.any(axis=1), width * height, 0.0))
+    areas[np.isnan(clip_corners).any(axis=(1, 2))] = np.nan
+    return areas
+
+
+def compute_projected_areas(clip_corners, width, height):
+    """
+    Compute the area in pixels of the screen rectangle of every projected bounding box without clipping it to the
+    screen. The corners behind the camera are projected at their distance as if they were in front of it, so a box
+    out of the screen or behind the camera gets the size it would have on the screen at the same distance
+    :param clip_corners: array (N, 8, 4)
+    :param width
+    :param height
+    :return: array (N) of areas (NaN for unknown bounding boxes)
+    """
+    w = np.maximum(np.abs(clip_corners[:, :, 3]), 1e-6)
+    ndc = clip_corners[:, :, :2] / w[:, :, None]
+    extents = ndc.max(axis=1) - ndc.min(axis=1)
+    return extents[:, 0] * width / 2 * extents[:, 1] * height / 2
+
+
+def compute_screen_density(polygons, areas):
+    """
+    Compute the polygons per pixel covered. Elements covering no pixel have an unknown density
+    :param polygons
+    :param areas
+    :return: densities
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(areas > 0, polygons / np.maximum(areas, 1), np.nan)
+
+
+def classify_frustum(clip_corners, margin=0.0):
+    """
+    Classify every projected bounding box as inside, partially inside or outside the camera frustum. A box is outside
+    when all its corners are outside of the same plane of the frustum. The margin widens the left, right, bottom and
+    top planes only, the near and far clipping planes are kept as they are
+    :param clip_corners: array (N, 8, 4)
+    :param margin: fraction of the width and the height of the screen added on each side for reflections and motion
+    :return: array (N) of FRUSTUM_INSIDE, FRUSTUM_PARTIAL, FRUSTUM_OUTSIDE or FRUSTUM_UNKNOWN
+    """
+    x, y, z, w = (clip_corners[:, :, i] for i in range(4))
+    # The screen spans 2 in clip space so each side moves by twice the margin
+    bound = w * (1 + 2 * margin)
+    outside_planes = np.stack([x < -bound, x > bound, y < -bound, y > bound, z < -w, z > w])
+    all_outside_one_plane = outside_planes.all(axis=2).any(axis=0)
+    all_inside = ~outside_planes.any(axis=(0, 2))
+    states = np.full(len(clip_corners), FRUSTUM_PARTIAL, dtype=np.int8)
+    states[all_inside] = FRUSTUM_INSIDE
+    states[all_outside_one_plane] = FRUSTUM_OUTSIDE
+    states[np.isnan(clip_corners).any(axis=(1, 2))] = FRUSTUM_UNKNOWN
+    return states
@@ -0,0 +1,121 @@
+import ctypes
+import struct
+import hashlib
+
+import numpy as np
+
+from arnold import *
+
+# ######################################################################################################################
+
+# Size in bytes of an element of an Arnold array by type
+_TYPE_SIZES = {
+    AI_TYPE_BYTE: 1,
+    AI_TYPE_INT: 4,
+    AI_TYPE_UINT: 4,
+    AI_TYPE_FLOAT: 4,
+    AI_TYPE_VECTOR2: 8,
+    AI_TYPE_VECTOR: 12,
+}
+# Arrays of a polymesh hashed to identify its geometry
+_TOPOLOGY_ARRAYS = ["nsides", "vidxs"]
+# Arrays of a polymesh counted in its memory
+_MEMORY_ARRAYS = ["nsides", "vidxs", "vlist", "nidxs", "nlist", "uvidxs", "uvlist"]
+# Positions are compared up to this precision so float noise doesn't hide a duplicate
+_POSITION_PRECISION = 1e-4
+
+
+# ######################################################################################################################
+
+class DuplicateFinder:
+    @staticmethod
+    def __map_array(node, param):
+        """
+        Map the buffer of an array parameter without copying it. The array has to be unmapped afterward
+        :param node
+        :param param
+        :return: array, buffer (None, None if the array is empty or of an unknown type)
+        """
+        array = AiNodeGetArray(node, param)
+        if not array: return None, None
+        nb_bytes = AiArrayGetNumElements(array) * AiArrayGetNumKeys(array) * \
+                   _TYPE_SIZES.get(AiArrayGetType(array), 0)
+        if nb_bytes == 0: return None, None
+        address = AiArrayMap(array)
+        return array, (ctypes.c_char * nb_bytes).from_address(address)
+
+    @staticmethod
+    def __get_array_memory(node, param):
+        """
+        Get the size of an array parameter
+        :param node
+        :param param
+        :return: size in bytes
+        """
+        array = AiNodeGetArray(node, param)
+        if not array: return 0
+        return AiArrayGetNumElements(array) * AiArrayGetNumKeys(array) * _TYPE_SIZES.get(AiArrayGetType(array), 0)
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.__groups = {}
+
+    def clear(self):
+        """
+        Forget the shapes added
+        :return:
+        """
+        self.__groups.clear()
+
+    def add(self, path, polygons, node):
+        """
+        Fingerprint a polymesh by hashing its subdivision, its topology and its positions relative to its bounding box,
+        so the copies moved around the scene are found too but not the same cages rendered differently. Only the
+        fingerprint is kept
+        :param path
+        :param polygons
+        :param node: polymesh node
+        :return:
+        """
+        fingerprint = hashlib.blake2b(digest_size=16)
+        fingerprint.update(struct.pack("<ii", AiNodeGetInt(node, "subdiv_type"),
+                                       AiNodeGetInt(node, "subdiv_iterations")))
+        for param in _TOPOLOGY_ARRAYS:
+            array, buffer = DuplicateFinder.__map_array(node, param)
+            if array is None: continue
+            # The same values stored in arrays of different types aren't the same topology
+            fingerprint.update(struct.pack("<B", AiArrayGetType(array)))
+            fingerprint.update(buffer)
+            fingerprint.update(b"|")
+            AiArrayUnmap(array)
+        array, buffer = DuplicateFinder.__map_array(node, "vlist")
+        if array is not None:
+            fingerprint.update(struct.pack("<B", AiArrayGetType(array)))
+            positions = np.frombuffer(buffer, dtype=np.float32).reshape(-1, 3)
+            relative_positions = np.round((positions - positions.min(axis=0)) / _POSITION_PRECISION)
+            fingerprint.update(relative_positions.astype(np.int64).tobytes())
+            del positions
+            AiArrayUnmap(array)
+        memory = sum([DuplicateFinder.__get_array_memory(node, param) for param in _MEMORY_ARRAYS])
+        self.__groups.setdefault(fingerprint.digest(), []).append((path, polygons, memory))
+
+    def get_groups(self):
+        """
+        Get the groups of identical shapes sorted by the memory wasted
+        :return: list of groups
+        """
+        groups = []
+        for shapes in self.__groups.values():
+            nb_shapes = len(shapes)
+            if nb_shapes < 2: continue
+            _, polygons, memory = shapes[0]
+            groups.append({
+                "paths": [path for path, _, _ in shapes],
+                "polygons": polygons,
+                "memory": memory,
+                "wasted_polygons": (nb_shapes - 1) * polygons,
+                "wasted_memory": (nb_shapes - 1) * memory
+            })
+        return sorted(groups, key=lambda group: group["wasted_memory"], reverse=True)
@@ -0,0 +1,288 @@
+from PySide2.QtCore import *
+
+import maya.OpenMaya as OpenMaya
+
+# ######################################################################################################################
+
+_DEFAULT_DELAY_MS = 400
+_WATCHED_ATTRIBUTES = ["inMesh", "aiSubdivIterations", "aiSubdivType"]
+
+
+# ######################################################################################################################
+
+class LiveMonitor(QObject):
+    # Dict of the path of the mesh to (polygons, subdivisions, maya object name) or None if it has been removed
+    meshes_changed = Signal(dict)
+
+    @staticmethod
+    def get_mesh_path(dag_path):
+        """
+        Get the path of a mesh like it is named in the diagnosis (the path of its transform)
+        :param dag_path
+        :return: path
+        """
+        return "/".join(dag_path.fullPathName().replace("|", "/").split("/")[:-1])
+
+    @staticmethod
+    def count_mesh(dag_path):
+        """
+        Compute the polygons count and the subdivisions of a mesh with the API
+        :param dag_path
+        :return: polygons, subdivisions (None if not subdivided)
+        """
+        fn_mesh = OpenMaya.MFnMesh(dag_path)
+        polygons = fn_mesh.numPolygons()
+        subdiv_iterations = None
+        if fn_mesh.hasAttribute("aiSubdivIterations"):
+            iterations = fn_mesh.findPlug("aiSubdivIterations", False).asInt()
+            if iterations > 0:
+                subdiv_iterations = iterations
+                polygons = polygons * pow(4, iterations)
+        return polygons, subdiv_iterations
+
+    def __init__(self, delay=_DEFAULT_DELAY_MS, parent=None):
+        """
+        Constructor
+        :param delay: time in ms during which the changes are gathered before being recounted
+        :param parent
+        """
+        super(LiveMonitor, self).__init__(parent)
+        self.__global_callbacks = []
+        self.__mesh_callbacks = {}
+        self.__counts = {}
+        self.__watch_new = True
+        self.__dirty_meshes = {}
+        self.__removed_paths = set()
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.setInterval(delay)
+        self.__timer.timeout.connect(self.__flush)
+
+    def is_active(self):
+        """
+        Getter of whether the callbacks are registered
+        :return: is active
+        """
+        return len(self.__global_callbacks) > 0
+
+    def get_counts(self):
+        """
+        Getter of the last count of every mesh watched
+        :return: dict of the path of the mesh to (polygons, subdivisions, maya object name)
+        """
+        return self.__counts
+
+    @staticmethod
+    def __get_dag_path(mesh):
+        """
+        Get the DAG path of a mesh that isn't an intermediate object
+        :param mesh
+        :return: DAG path (None for an intermediate object)
+        """
+        fn_dag = OpenMaya.MFnDagNode(mesh)
+        if fn_dag.isIntermediateObject(): return None
+        dag_path = OpenMaya.MDagPath()
+        fn_dag.getPath(dag_path)
+        return dag_path
+
+    @staticmethod
+    def __count(dag_path):
+        """
+        Count a mesh
+        :param dag_path
+        :return: polygons, subdivisions, maya object name
+        """
+        polygons, subdiv_iterations = LiveMonitor.count_mesh(dag_path)
+        transform_path = OpenMaya.MDagPath(dag_path)
+        transform_path.pop()
+        return polygons, subdiv_iterations, transform_path.fullPathName()
+
+    def start(self, in_scope=None, include_hidden=True, watch_new=True):
+        """
+        Seed the counts of the meshes in the scope of the diagnosis and register the callbacks. Only the selected
+        meshes are watched, so the callbacks follow the selection instead of being registered on the whole scene. Only
+        the meshes changed afterward are sent
+        :param in_scope: function telling whether the path of a mesh is in the scope (None for all the meshes)
+        :param include_hidden: whether the hidden meshes are in the scope
+        :param watch_new: whether the meshes created afterward are in the scope
+        :return:
+        """
+        if self.is_active(): return
+        self.__watch_new = watch_new
+        it = OpenMaya.MItDependencyNodes(OpenMaya.MFn.kMesh)
+        while not it.isDone():
+            dag_path = LiveMonitor.__get_dag_path(it.thisNode())
+            it.next()
+            if dag_path is None or not include_hidden and not dag_path.isVisible(): continue
+            path = LiveMonitor.get_mesh_path(dag_path)
+            if in_scope is not None and not in_scope(path): continue
+            self.__counts[path] = LiveMonitor.__count(dag_path)
+        self.__global_callbacks.append(
+            OpenMaya.MDGMessage.addNodeAddedCallback(self.__on_node_added, "mesh"))
+        self.__global_callbacks.append(
+            OpenMaya.MDGMessage.addNodeRemovedCallback(self.__on_node_removed, "mesh"))
+        self.__global_callbacks.append(
+            OpenMaya.MEventMessage.addEventCallback("SelectionChanged", self.__on_selection_changed))
+        self.__on_selection_changed()
+
+    def stop(self):
+        """
+        Remove all the callbacks
+        :return:
+        """
+        self.__timer.stop()
+        for callback_id in self.__global_callbacks:
+            OpenMaya.MMessage.removeCallback(callback_id)
+        self.__global_callbacks = []
+        for callback_ids in self.__mesh_callbacks.values():
+            for callback_id in callback_ids:
+                OpenMaya.MMessage.removeCallback(callback_id)
+        self.__mesh_callbacks.clear()
+        self.__counts.clear()
+        self.__dirty_meshes.clear()
+        self.__removed_paths.clear()
+
+    def __on_selection_changed(self, client_data=None):
+        """
+        Watch the meshes of the scope selected, directly or through their transform, and release the others
+        :param client_data
+        :return:
+        """
+        selection = OpenMaya.MSelectionList()
+        OpenMaya.MGlobal.getActiveSelectionList(selection)
+        selected_meshes = {}
+        it = OpenMaya.MItSelectionList(selection)
+        while not it.isDone():
+            dag_path = OpenMaya.MDagPath()
+            it.getDagPath(dag_path)
+            it.next()
+            if dag_path.hasFn(OpenMaya.MFn.kMesh) and not dag_path.hasFn(OpenMaya.MFn.kTransform):
+                shape_paths = [dag_path]
+            else:
+                shape_paths = []
+                for index in range(dag_path.numberOfShapesDirectlyBelow()):
+                    shape_path = OpenMaya.MDagPath(dag_path)
+                    shape_path.extendToShapeDirectlyBelow(index)
+                    if shape_path.hasFn(OpenMaya.MFn.kMesh):
+                        shape_paths.append(shape_path)
+            for shape_path in shape_paths:
+                if LiveMonitor.get_mesh_path(shape_path) not in self.__counts: continue
+                mesh = shape_path.node()
+                selected_meshes[OpenMaya.MObjectHandle(mesh).hashCode()] = mesh
+        for key in set(self.__mesh_callbacks) - set(selected_meshes):
+            self.__unwatch_mesh(key)
+        for mesh in selected_meshes.values():
+            self.__watch_mesh(mesh)
+
+    def __unwatch_mesh(self, key):
+        """
+        Remove the callbacks of a mesh
+        :param key: hash code of the mesh
+        :return:
+        """
+        for callback_id in self.__mesh_callbacks.pop(key, []):
+            OpenMaya.MMessage.removeCallback(callback_id)
+
+    def __watch_mesh(self, mesh):
+        """
+        Register the callbacks of a mesh
+        :param mesh
+        :return:
+        """
+        key = OpenMaya.MObjectHandle(mesh).hashCode()
+        if key in self.__mesh_callbacks: return
+        self.__mesh_callbacks[key] = [
+            OpenMaya.MPolyMessage.addPolyTopologyChangedCallback(mesh, self.__on_topology_changed),
+            OpenMaya.MNodeMessage.addAttributeChangedCallback(mesh, self.__on_attribute_changed)
+        ]
+
+    def __mark_dirty(self, mesh):
+        """
+        Mark a mesh as to be recounted in the next batch
+        :param mesh
+        :return:
+        """
+        handle = OpenMaya.MObjectHandle(mesh)
+        self.__dirty_meshes[handle.hashCode()] = handle
+        # Restarted on every change so the batch is sent once the changes stop
+        self.__timer.start()
+
+    def __on_node_added(self, mesh, client_data):
+        """
+        On mesh created
+        :param mesh
+        :param client_data
+        :return:
+        """
+        if self.__watch_new:
+            self.__mark_dirty(mesh)
+
+    def __on_node_removed(self, mesh, client_data):
+        """
+        On mesh removed
+        :param mesh
+        :param client_data
+        :return:
+        """
+        key = OpenMaya.MObjectHandle(mesh).hashCode()
+        self.__unwatch_mesh(key)
+        self.__dirty_meshes.pop(key, None)
+        fn_dag = OpenMaya.MFnDagNode(mesh)
+        if fn_dag.isIntermediateObject(): return
+        dag_path = OpenMaya.MDagPath()
+        fn_dag.getPath(dag_path)
+        self.__removed_paths.add(LiveMonitor.get_mesh_path(dag_path))
+        self.__timer.start()
+
+    def __on_topology_changed(self, mesh, client_data):
+        """
+        On topology of a mesh changed
+        :param mesh
+        :param client_data
+        :return:
+        """
+        self.__mark_dirty(mesh)
+
+    def __on_attribute_changed(self, msg, plug, other_plug, client_data):
+        """
+        On attribute of a mesh changed. Only the attributes changing the polygons count are considered
+        :param msg
+        :param plug
+        :param other_plug
+        :param client_data
+        :return:
+        """
+        if not msg & (OpenMaya.MNodeMessage.kAttributeSet | OpenMaya.MNodeMessage.kConnectionMade |
+                      OpenMaya.MNodeMessage.kConnectionBroken):
+            return
+        if plug.partialName(False, False, False, False, False, True) not in _WATCHED_ATTRIBUTES: return
+        self.__mark_dirty(plug.node())
+
+    def __flush(self):
+        """
+        Recount the dirty meshes and send the counts that changed
+        :return:
+        """
+        changes = {}
+        added = False
+        for path in self.__removed_paths:
+            if self.__counts.pop(path, None) is not None:
+                changes[path] = None
+        for handle in self.__dirty_meshes.values():
+            if not handle.isValid(): continue
+            dag_path = LiveMonitor.__get_dag_path(handle.object())
+            if dag_path is None: continue
+            path = LiveMonitor.get_mesh_path(dag_path)
+            count = LiveMonitor.__count(dag_path)
+            changes.pop(path, None)
+            if self.__counts.get(path) == count: continue
+            added |= path not in self.__counts
+            self.__counts[path] = count
+            changes[path] = count
+        self.__dirty_meshes.clear()
+        self.__removed_paths.clear()
+        if added:
+            # The meshes created are watched once they are in the scope
+            self.__on_selection_changed()
+        if len(changes) > 0:
+            self.meshes_changed.emit(changes)
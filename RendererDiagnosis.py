@@ -1,8 +1,9 @@
 import os
 import sys
-import tempfile
 from enum import Enum
 
+import numpy as np
+
 from PySide2 import QtCore
 from PySide2 import QtGui
 from PySide2 import QtWidgets
@@ -20,13 +21,33 @@ import pymel.core as pm
 from common.utils import *
 from common.Prefs import *
 
-sys.path.append(r"R:\pipeline\networkInstall\arnold\SDK\Arnold-7.1.4.2-windows")
-from arnold import *
+from .SceneDiagnosis import SceneDiagnosis, DiagnosisError
+from .LiveMonitor import LiveMonitor
+from .BudgetEngine import BudgetEngine
+from .ResultStore import ROOT_NODE
+from .CameraProjection import FRUSTUM_NAMES, FRUSTUM_OUTSIDE
 
 # ######################################################################################################################
 
 _FILE_NAME_PREFS = "renderer_diagnosis"
-_NAME_TEMP_FILE = "renderer_diagnosis_export.ass"
+
+_NB_LIVE_TOP_OFFENDERS = 5
+
+_VIOLATION_COLOR = (170, 40, 40)
+
+# Columns of the result store used to sort the list for each column of the list
+_LIST_SORT_COLUMNS = {
+    1: ["subdiv", "polygons"],
+    2: ["dist_poly", "polygons"],
+    3: ["polygons"],
+    4: ["polygons"],
+    5: ["screen_density", "polygons"],
+    6: ["frustum", "polygons"],
+    7: ["micropolygons", "polygons"],
+    8: ["displaced", "micropolygons"],
+    9: ["tessellation_cost", "micropolygons"],
+    10: ["texture_memory", "polygons"],
+}
 
 _GRADIENT_COLOR = [
     (0.0, 100, 255, 65),
@@ -86,114 +107,6 @@ class ListSort:
         self.__order = not self.__order
 
 
-class ElementPolygon:
-    def __init__(self, name, path, polygons=0):
-        """
-        Constructor
-        :param name
-        :param path
-        :param polygons
-        """
-        self.__name = name
-        self.__polygons = polygons
-        self.__path = path
-        self.__maya_obj = None
-        self.__subdivisions = None
-        self.__children = []
-
-    def add_child(self, key, path):
-        """
-        Add a child with the given key or retrieve an existent one
-        :param key
-        :param path
-        :return: child created
-        """
-        for child in self.__children:
-            if child.get_name() == key:
-                return child
-        item = ElementPolygon(key, path)
-        self.__children.append(item)
-        return item
-
-    def set_polygons(self, polygons):
-        """
-        Setter of the polygons count
-        :param polygons
-        :return:
-        """
-        self.__polygons = polygons
-
-    def set_maya_obj(self, maya_obj):
-        """
-        Setter of the maya object linked
-        :param maya_obj
-        :return:
-        """
-        self.__maya_obj = maya_obj
-
-    def set_subdivisions(self, subdivisions):
-        """
-        Setter of the subdivisions
-        :param subdivisions
-        :return:
-        """
-        self.__subdivisions = subdivisions
-
-    def get_polygons(self):
-        """
-        Getter of the polygons count
-        :return: polygons count
-        """
-        return self.__polygons
-
-    def get_subdivisions(self):
-        """
-        Getter of the subdivisions
-        :return: subdivisions
-        """
-        return self.__subdivisions
-
-    def get_maya_objs(self):
-        """
-        Getter of the maya objects linked. If it doesn't have a maya object linked, find all maya objects of children
-        :return: maya objects
-        """
-        if self.__maya_obj is None:
-            arr_maya_objs = []
-            for child in self.__children:
-                arr_maya_objs.extend(child.get_maya_objs())
-            return arr_maya_objs
-        return [self.__maya_obj]
-
-    def get_name(self):
-        """
-        Getter of the name
-        :return: name
-        """
-        return self.__name
-
-    def get_path(self):
-        """
-        Getter of the path
-        :return: path
-        """
-        return self.__path
-
-    def get_children(self):
-        """
-        Getter of the children
-        :return: children
-        """
-        return self.__children
-
-    def sort_children(self):
-        """
-        Sort the children accordingly to their polygons count
-        :return:
-        """
-        self.__children = sorted(self.__children, key=lambda el: el.get_polygons(), reverse=True)
-
-
 class RendererDiagnosis(QDialog):
     @staticmethod
     def val_to_color(max_val, val):
@@ -246,20 +159,61 @@ class RendererDiagnosis(QDialog):
             return str(val)
 
     @staticmethod
-    def __set_dcc_for_standins():
+    def format_density(val):
         """
-        Set a constant to all standins to retrieve the right maya object after diagnose
-        :return:
+        Beautify a density. Example :
+        25312.4 -> 25.3K
+        12.345 -> 12.3
+        0.01234 -> 0.012
+        :param val
+        :return: beautified density
+        """
+        if val >= 1000:
+            return RendererDiagnosis.format_val(val)
+        elif val >= 1:
+            return str(round(val, 1))
+        else:
+            return str(round(val, 3))
+
+    @staticmethod
+    def format_bytes(val):
+        """
+        Beautify a memory size. Example :
+        2147483648 -> 2.0 GB
+        5452595 -> 5.2 MB
+        2048 -> 2.0 KB
+        :param val: size in bytes
+        :return: beautified size
+        """
+        for unit, size in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024)):
+            if val >= size:
+                return str(round(val / size, 1)) + " " + unit
+        return str(round(val)) + " B"
+
+    @staticmethod
+    def __create_color_cell(max_val, val, text):
         """
-        standins = pm.ls(type="aiStandIn")
-        for standin in standins:
-            if not pm.objExists(standin + ".mtoa_constant_renderer_diagnosis_dcc"):
-                pm.addAttr(standin, longName="mtoa_constant_renderer_diagnosis_dcc", dataType="string")
-            pm.setAttr(standin + ".mtoa_constant_renderer_diagnosis_dcc", standin.name())
+        Create a cell with a text and a color indicator of the value relative to the max value
+        :param max_val
+        :param val
+        :param text
+        :return: widget
+        """
+        r, g, b = RendererDiagnosis.val_to_color(max_val, val)
+        widget_wrapper = QWidget()
+        color_widget = QWidget()
+        color_widget.setStyleSheet("background-color:rgb(" + str(r) + "," + str(g) + "," + str(b) + ");")
+        color_widget.setFixedSize(QSize(12, 12))
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 20, 0)
+        layout.addStretch()
+        layout.addWidget(QLabel(text))
+        layout.addWidget(color_widget)
+        widget_wrapper.setLayout(layout)
+        return widget_wrapper
 
     def __init__(self, prnt=wrapInstance(int(omui.MQtUtil.mainWindow()), QWidget)):
         super(RendererDiagnosis, self).__init__(prnt)
-        AiBegin()
 
         # Common Preferences (common preferences on all tools)
         self.__common_prefs = Prefs()
@@ -267,14 +221,31 @@ class RendererDiagnosis(QDialog):
         self.__prefs = Prefs(_FILE_NAME_PREFS)
 
         # Model attributes
-        self.__temp_path = (tempfile.gettempdir() + "/" + _NAME_TEMP_FILE).replace("\\", "/")
-        self.__dict_obj_poly = {}
-        self.__tree_obj_poly = None
-        self.__list_obj_poly = []
-        self.__standins_auto_instance = []
-        self.__hidden_objects = []
+        self.__scene_diagnosis = SceneDiagnosis()
+        self.__result_store = self.__scene_diagnosis.get_result_store()
+        # Sums of the values of the elements on every node of the tree of the result store
+        self.__tree_values = None
+        # Number of textures and their memory on every node using textures
+        self.__tree_textures = {}
+        # Items of the tree by node and rows of the list by path to refresh them one by one
+        self.__tree_ui_items = {}
+        self.__list_rows = {}
+        # Max values of the columns of the list used for the colors
+        self.__list_maxima = {}
         self.__diagnose_hidden_element = False
+        # Whether the last diagnosis was on the selection (None if there was none) to follow the same scope live
+        self.__diagnosed_selected = None
+        self.__read_standins_files = False
+        self.__frustum_margin = 0.0
+        self.__find_duplicates = False
+        self.__diagnose_textures = False
         self.__list_sort = ListSort(3, True)
+        self.__budget_path = None
+        self.__budget_engine = None
+        self.__budget_verdict = None
+        self.__budget_violations = {}
+        self.__live_monitor = LiveMonitor(parent=self)
+        self.__live_monitor.meshes_changed.connect(self.__on_live_meshes_changed)
 
         # UI attributes
         self.__ui_font = QFont("Segoe UI", 10)
@@ -307,6 +278,11 @@ class RendererDiagnosis(QDialog):
         pos = self.pos()
         self.__prefs["window_pos"] = {"x": pos.x(), "y": pos.y()}
         self.__prefs["diagnose_hidden_element"] = self.__diagnose_hidden_element
+        self.__prefs["read_standins_files"] = self.__read_standins_files
+        self.__prefs["frustum_margin"] = self.__frustum_margin
+        self.__prefs["find_duplicates"] = self.__find_duplicates
+        self.__prefs["diagnose_textures"] = self.__diagnose_textures
+        self.__prefs["budget_path"] = self.__budget_path
         self.__prefs["list_sort"] = {"index": self.__list_sort.get_index(), "order":self.__list_sort.get_order()}
 
     def __retrieve_prefs(self):
@@ -326,6 +302,21 @@ class RendererDiagnosis(QDialog):
         if "diagnose_hidden_element" in self.__prefs:
             self.__diagnose_hidden_element = self.__prefs["diagnose_hidden_element"]
 
+        if "read_standins_files" in self.__prefs:
+            self.__read_standins_files = self.__prefs["read_standins_files"]
+
+        if "frustum_margin" in self.__prefs:
+            self.__frustum_margin = self.__prefs["frustum_margin"]
+
+        if "find_duplicates" in self.__prefs:
+            self.__find_duplicates = self.__prefs["find_duplicates"]
+
+        if "diagnose_textures" in self.__prefs:
+            self.__diagnose_textures = self.__prefs["diagnose_textures"]
+
+        if "budget_path" in self.__prefs and self.__prefs["budget_path"] is not None:
+            self.__load_budget(self.__prefs["budget_path"])
+
         if "list_sort" in self.__prefs:
             list_sort_data = self.__prefs["list_sort"]
             self.__list_sort.set_index(list_sort_data["index"])
@@ -338,6 +329,15 @@ class RendererDiagnosis(QDialog):
         """
         self.__save_prefs()
 
+    def closeEvent(self, arg__1: QCloseEvent) -> None:
+        """
+        Remove the live callbacks and shut the Arnold session down
+        :return:
+        """
+        self.__live_monitor.stop()
+        self.__scene_diagnosis.end()
+        super(RendererDiagnosis, self).closeEvent(arg__1)
+
     def __create_ui(self):
         """
         Create the ui
@@ -376,6 +376,61 @@ class RendererDiagnosis(QDialog):
         self.__ui_hidden_element_cb.stateChanged.connect(self.__on_diagnose_hidden_element_checked)
         btn_lyt.addWidget(self.__ui_hidden_element_cb)
 
+        # Read stand-ins files checkbox
+        self.__ui_read_standins_files_cb = QCheckBox("Read stand-ins files")
+        self.__ui_read_standins_files_cb.setToolTip(
+            "Parse each ASS file referenced by the stand-ins once in parallel instead of expanding every stand-in")
+        self.__ui_read_standins_files_cb.stateChanged.connect(self.__on_read_standins_files_checked)
+        btn_lyt.addWidget(self.__ui_read_standins_files_cb)
+
+        # Live checkbox
+        self.__ui_live_cb = QCheckBox("Live")
+        self.__ui_live_cb.setToolTip("Recount the meshes while they are edited")
+        self.__ui_live_cb.stateChanged.connect(self.__on_live_checked)
+        btn_lyt.addWidget(self.__ui_live_cb)
+
+        # Find duplicates checkbox
+        self.__ui_find_duplicates_cb = QCheckBox("Find duplicates")
+        self.__ui_find_duplicates_cb.setToolTip("Find the identical meshes that could be instanced")
+        self.__ui_find_duplicates_cb.stateChanged.connect(self.__on_find_duplicates_checked)
+        btn_lyt.addWidget(self.__ui_find_duplicates_cb)
+
+        # Diagnose textures checkbox
+        self.__ui_diagnose_textures_cb = QCheckBox("Diagnose textures")
+        self.__ui_diagnose_textures_cb.setToolTip("Read the headers of the textures to estimate their memory")
+        self.__ui_diagnose_textures_cb.stateChanged.connect(self.__on_diagnose_textures_checked)
+        btn_lyt.addWidget(self.__ui_diagnose_textures_cb)
+
+        # Frustum margin
+        btn_lyt.addWidget(QLabel("Frustum margin"))
+        self.__ui_frustum_margin_spinbox = QSpinBox()
+        self.__ui_frustum_margin_spinbox.setRange(0, 200)
+        self.__ui_frustum_margin_spinbox.setSuffix("%")
+        self.__ui_frustum_margin_spinbox.setToolTip(
+            "Fraction of the width and the height of the screen added on each side for the reflections and the "
+            "motion.\nThe near and far clipping planes are not widened")
+        self.__ui_frustum_margin_spinbox.valueChanged.connect(self.__on_frustum_margin_changed)
+        btn_lyt.addWidget(self.__ui_frustum_margin_spinbox)
+
+        # Budget buttons
+        self.__ui_load_budget_btn = QPushButton("Load budget")
+        self.__ui_load_budget_btn.clicked.connect(self.__on_load_budget)
+        self.__ui_load_budget_btn.setStyleSheet("padding:8px 15px")
+        btn_lyt.addWidget(self.__ui_load_budget_btn)
+        self.__ui_export_verdict_btn = QPushButton("Export verdict")
+        self.__ui_export_verdict_btn.clicked.connect(self.__on_export_verdict)
+        self.__ui_export_verdict_btn.setStyleSheet("padding:8px 15px")
+        btn_lyt.addWidget(self.__ui_export_verdict_btn)
+        self.__ui_budget_lbl = QLabel()
+        btn_lyt.addWidget(self.__ui_budget_lbl)
+
+        # Live summary
+        self.__ui_live_lbl = QLabel()
+        self.__ui_live_lbl.setAlignment(Qt.AlignCenter)
+        self.__ui_live_lbl.setWordWrap(True)
+        self.__ui_live_lbl.hide()
+        main_lyt.addWidget(self.__ui_live_lbl)
+
         # Grid Layout
         content_lyt = QGridLayout()
         main_lyt.addLayout(content_lyt, 1)
@@ -387,9 +442,10 @@ class RendererDiagnosis(QDialog):
 
         # Hierarchy
         self.__ui_tree_polygons = QtWidgets.QTreeWidget()
-        self.__ui_tree_polygons.setColumnCount(3)
+        self.__ui_tree_polygons.setColumnCount(7)
         self.__ui_tree_polygons.setAlternatingRowColors(True)
-        self.__ui_tree_polygons.setHeaderLabels(["Element", "Complexity", "Poly"])
+        self.__ui_tree_polygons.setHeaderLabels(
+            ["Element", "Complexity", "Poly", "Off-cam", "Micropoly", "Est. cost", "Tex memory"])
         self.__ui_tree_polygons.setFont(self.__ui_font)
         header = self.__ui_tree_polygons.header()
         header.setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
@@ -399,13 +455,14 @@ class RendererDiagnosis(QDialog):
         content_lyt.addWidget(self.__ui_tree_polygons, 1, 0)
 
         # List
-        self.__ui_list_polygons = QTableWidget(0, 5)
+        self.__ui_list_polygons = QTableWidget(0, 11)
         self.__ui_list_polygons.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Preferred)
         self.__ui_list_polygons.verticalHeader().hide()
         self.__ui_list_polygons.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.__ui_list_polygons.setSelectionMode(QAbstractItemView.SingleSelection)
         self.__ui_list_polygons.setHorizontalHeaderLabels(
-            ["Element", "Subdiv", "Dist x Poly", "Complexity", "Poly"])
+            ["Element", "Subdiv", "Dist x Poly", "Complexity", "Poly", "Poly / px", "Frustum", "Micropoly",
+             "Displaced", "Est. cost", "Tex memory"])
         self.__ui_list_polygons.setShowGrid(False)
         self.__ui_list_polygons.setAlternatingRowColors(True)
         self.__ui_list_polygons.setFont(self.__ui_font)
@@ -416,7 +473,44 @@ class RendererDiagnosis(QDialog):
         horizontal_header.setSectionResizeMode(0, QHeaderView.Stretch)
         self.__ui_list_polygons.setEditTriggers(QTableWidget.NoEditTriggers)
         self.__ui_list_polygons.itemSelectionChanged.connect(self.__on_list_item_selected)
-        content_lyt.addWidget(self.__ui_list_polygons, 1, 1)
+
+        # Duplicates
+        self.__ui_duplicates = QTableWidget(0, 5)
+        self.__ui_duplicates.verticalHeader().hide()
+        self.__ui_duplicates.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.__ui_duplicates.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.__ui_duplicates.setHorizontalHeaderLabels(
+            ["Element", "Copies", "Poly", "Wasted poly", "Wasted memory"])
+        self.__ui_duplicates.setShowGrid(False)
+        self.__ui_duplicates.setAlternatingRowColors(True)
+        self.__ui_duplicates.setFont(self.__ui_font)
+        duplicates_header = self.__ui_duplicates.horizontalHeader()
+        duplicates_header.setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        duplicates_header.setSectionResizeMode(0, QHeaderView.Stretch)
+        self.__ui_duplicates.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.__ui_duplicates.itemSelectionChanged.connect(self.__on_duplicates_item_selected)
+
+        # Textures
+        self.__ui_textures = QTableWidget(0, 7)
+        self.__ui_textures.verticalHeader().hide()
+        self.__ui_textures.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.__ui_textures.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.__ui_textures.setHorizontalHeaderLabels(
+            ["Texture", "Resolution", "Channels", "Bit depth", "Tiled", "Mips", "Memory"])
+        self.__ui_textures.setShowGrid(False)
+        self.__ui_textures.setAlternatingRowColors(True)
+        self.__ui_textures.setFont(self.__ui_font)
+        textures_header = self.__ui_textures.horizontalHeader()
+        textures_header.setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        textures_header.setSectionResizeMode(0, QHeaderView.Stretch)
+        self.__ui_textures.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.__ui_textures.itemSelectionChanged.connect(self.__on_textures_item_selected)
+
+        self.__ui_list_tabs = QTabWidget()
+        self.__ui_list_tabs.addTab(self.__ui_list_polygons, "Elements")
+        self.__ui_list_tabs.addTab(self.__ui_duplicates, "Duplicates")
+        self.__ui_list_tabs.addTab(self.__ui_textures, "Textures")
+        content_lyt.addWidget(self.__ui_list_tabs, 1, 1)
 
         # Linear Gradient
         linear_gradient_lyt = QHBoxLayout()
@@ -437,10 +531,33 @@ class RendererDiagnosis(QDialog):
         :return:
         """
         self.__ui_hidden_element_cb.setChecked(self.__diagnose_hidden_element)
+        self.__ui_read_standins_files_cb.setChecked(self.__read_standins_files)
+        self.__ui_frustum_margin_spinbox.setValue(round(self.__frustum_margin * 100))
+        self.__ui_find_duplicates_cb.setChecked(self.__find_duplicates)
+        self.__ui_diagnose_textures_cb.setChecked(self.__diagnose_textures)
+        self.__refresh_budget()
         self.__refresh_gradient()
         self.__refresh_list_sorting()
         self.__refresh_list()
         self.__refresh_tree()
+        self.__refresh_duplicates()
+        self.__refresh_textures()
+
+    def __refresh_budget(self):
+        """
+        Refresh the budget status
+        :return:
+        """
+        self.__ui_export_verdict_btn.setEnabled(self.__budget_verdict is not None)
+        if self.__budget_engine is None:
+            self.__ui_budget_lbl.setText("No budget")
+        elif self.__budget_verdict is None:
+            self.__ui_budget_lbl.setText(os.path.basename(self.__budget_path))
+        elif self.__budget_verdict["passed"]:
+            self.__ui_budget_lbl.setText("Budget passed")
+        else:
+            self.__ui_budget_lbl.setText(str(len(self.__budget_verdict["violations"])) + " budget violations")
+        self.__ui_budget_lbl.setToolTip(self.__budget_path if self.__budget_path is not None else "")
 
     def __refresh_gradient(self):
         """
@@ -461,151 +578,282 @@ class RendererDiagnosis(QDialog):
         self.__ui_list_polygons.horizontalHeader().setSortIndicator(
             self.__list_sort.get_index(), Qt.AscendingOrder if self.__list_sort.get_order() else Qt.DescendingOrder)
 
+    def __set_list_polygons_cells(self, row_index, row):
+        """
+        Fill the cells of a row of the list depending on the polygons count of its element
+        :param row_index
+        :param row
+        :return:
+        """
+        scene_polygons = self.__tree_values["polygons"][ROOT_NODE]
+        polygons = row.get_polygons()
+        dist_poly = row.get_dist_poly()
+        subdivisions = row.get_subdivisions()
+        screen_density = row.get_screen_density()
+        # Subdivisions
+        if subdivisions is not None:
+            subdivisions_item = QTableWidgetItem(str(subdivisions))
+            subdivisions_item.setTextAlignment(Qt.AlignCenter)
+            self.__ui_list_polygons.setItem(row_index, 1, subdivisions_item)
+        else:
+            self.__ui_list_polygons.takeItem(row_index, 1)
+        # Dist/Poly
+        if dist_poly is not None:
+            max_dist_poly = self.__list_maxima["dist_poly"]
+            self.__ui_list_polygons.setCellWidget(row_index, 2, RendererDiagnosis.__create_color_cell(
+                max_dist_poly, dist_poly, str(round(dist_poly * 100 / max_dist_poly, 1)) + "%"))
+        else:
+            self.__ui_list_polygons.removeCellWidget(row_index, 2)
+        # Complexity
+        self.__ui_list_polygons.setCellWidget(row_index, 3, RendererDiagnosis.__create_color_cell(
+            self.__list_maxima["polygons"], polygons, str(round(polygons * 100 / scene_polygons, 1)) + "%"))
+        # Polygons
+        polygons_item = QTableWidgetItem(RendererDiagnosis.format_val(polygons))
+        polygons_item.setTextAlignment(Qt.AlignCenter)
+        self.__ui_list_polygons.setItem(row_index, 4, polygons_item)
+        # Polygons per pixel
+        if screen_density is not None:
+            self.__ui_list_polygons.setCellWidget(row_index, 5, RendererDiagnosis.__create_color_cell(
+                self.__list_maxima["screen_density"], screen_density,
+                RendererDiagnosis.format_density(screen_density)))
+        else:
+            self.__ui_list_polygons.removeCellWidget(row_index, 5)
+
     def __refresh_list(self):
         """
         Refresh the list displaying elements sorted by size
         :return:
         """
-        if self.__tree_obj_poly is None: return
-        scene_polygons = self.__tree_obj_poly.get_polygons()
+        self.__list_rows.clear()
+        if self.__tree_values is None: return
         self.__ui_list_polygons.setRowCount(0)
-        list_obj_polygons = sorted(list(self.__dict_obj_poly.items()), key=lambda el: el[1]["polygons"], reverse=True)
-        list_sorted_dist_poly = sorted(list(self.__dict_obj_poly.items()),
-                                             key=lambda el: (el[1]["dist_poly"],el[1]["polygons"]), reverse=True)
         row_index = 0
-        max_poly = list_obj_polygons[0][1]["polygons"] if len(list_obj_polygons) > 0 else 0
-        max_dist_poly = list_sorted_dist_poly[0][1]["dist_poly"] if len(
-            list_sorted_dist_poly) > 0 else 0
+        nb_rows = len(self.__result_store)
+        self.__list_maxima["polygons"] = int(self.__result_store.column("polygons").max()) if nb_rows > 0 else 0
+        for name in ["dist_poly", "screen_density", "tessellation_cost", "texture_memory"]:
+            values = self.__result_store.column(name)
+            self.__list_maxima[name] = float(np.nanmax(values)) \
+                if nb_rows > 0 and not np.all(np.isnan(values)) else 0
 
         index_sort = self.__list_sort.get_index()
         order_sort = self.__list_sort.get_order()
 
-        if index_sort == 1:
-            used_list = sorted(list(self.__dict_obj_poly.items()),
-                               key=lambda el: (el[1]["subdiv"],el[1]["polygons"]), reverse=order_sort)
-        elif index_sort==2:
-            used_list = list_sorted_dist_poly if order_sort else \
-                sorted(list(self.__dict_obj_poly.items()),
-                       key=lambda el: (el[1]["dist_poly"],el[1]["polygons"]))
-        else:
-            used_list = list_obj_polygons if order_sort else \
-                sorted(list(self.__dict_obj_poly.items()), key=lambda el: el[1]["polygons"])
+        sorted_indices = self.__result_store.argsort(_LIST_SORT_COLUMNS.get(index_sort, ["polygons"]), order_sort)
 
-        for node_name, data in used_list:
-            polygons = data["polygons"]
-            dist_poly = data["dist_poly"]
-            subdivisions = data["subdiv"]
+        for row in self.__result_store.rows(sorted_indices):
+            node_name = row.get_path()
             self.__ui_list_polygons.insertRow(row_index)
+            self.__list_rows[node_name] = row_index
             # Element
             elem_item = QTableWidgetItem("  " + node_name)
             elem_item.setToolTip(node_name)
-            elem_item.setData(Qt.UserRole, (node_name, data["maya_obj"]))
+            if node_name in self.__budget_violations:
+                elem_item.setBackground(QColor(*_VIOLATION_COLOR))
+                elem_item.setToolTip(node_name + "\n" + "\n".join(self.__budget_violations[node_name]))
+            elem_item.setData(Qt.UserRole, (node_name, row.get_maya_obj_name()))
             self.__ui_list_polygons.setItem(row_index, 0, elem_item)
-            # Subdivisions
-            if subdivisions is not None:
-                subdivisions_item = QTableWidgetItem(str(subdivisions))
-                subdivisions_item.setTextAlignment(Qt.AlignCenter)
-                self.__ui_list_polygons.setItem(row_index, 1, subdivisions_item)
-            # Dist/Poly
-            if dist_poly is not None:
-                r, g, b = RendererDiagnosis.val_to_color(max_dist_poly, dist_poly)
-                dist_poly_widget_wrapper = QWidget()
-                dist_poly_widget = QWidget()
-                dist_poly_widget.setStyleSheet("background-color:rgb(" + str(r) + "," + str(g) + "," + str(b) + ");")
-                dist_poly_widget.setFixedSize(QSize(12, 12))
-                dist_poly_layout = QHBoxLayout()
-                dist_poly_layout.setContentsMargins(0, 0, 20, 0)
-                dist_poly_layout.addStretch()
-                dist_poly_layout.addWidget(QLabel(str(round(dist_poly * 100 / max_dist_poly, 1)) + "%"))
-                dist_poly_layout.addWidget(dist_poly_widget)
-                dist_poly_widget_wrapper.setLayout(dist_poly_layout)
-                self.__ui_list_polygons.setCellWidget(row_index, 2, dist_poly_widget_wrapper)
-            # Complexity
-            r, g, b = RendererDiagnosis.val_to_color(max_poly, polygons)
-            icon_widget_wrapper = QWidget()
-            icon_widget = QWidget()
-            icon_widget.setStyleSheet("background-color:rgb(" + str(r) + "," + str(g) + "," + str(b) + ");")
-            icon_widget.setFixedSize(QSize(12, 12))
-            icon_layout = QHBoxLayout()
-            icon_layout.setContentsMargins(0, 0, 20, 0)
-            icon_layout.addStretch()
-            icon_layout.addWidget(QLabel(str(round(polygons * 100 / scene_polygons, 1)) + "%"))
-            icon_layout.addWidget(icon_widget)
-            icon_widget_wrapper.setLayout(icon_layout)
-            self.__ui_list_polygons.setCellWidget(row_index, 3, icon_widget_wrapper)
+            # Subdivisions, Dist/Poly, Complexity, Polygons and Polygons per pixel
+            self.__set_list_polygons_cells(row_index, row)
+            # Frustum
+            frustum = row.get_frustum()
+            if frustum is not None:
+                frustum_item = QTableWidgetItem(FRUSTUM_NAMES[frustum])
+                frustum_item.setTextAlignment(Qt.AlignCenter)
+                self.__ui_list_polygons.setItem(row_index, 6, frustum_item)
+            # Micropolygons
+            micropolygons = row.get_micropolygons()
+            if micropolygons is not None:
+                micropolygons_item = QTableWidgetItem(RendererDiagnosis.format_val(round(micropolygons)))
+                micropolygons_item.setTextAlignment(Qt.AlignCenter)
+                self.__ui_list_polygons.setItem(row_index, 7, micropolygons_item)
+            # Displaced
+            if row.is_displaced():
+                displaced_item = QTableWidgetItem("Yes")
+                displaced_item.setTextAlignment(Qt.AlignCenter)
+                self.__ui_list_polygons.setItem(row_index, 8, displaced_item)
+            # Estimated cost
+            tessellation_cost = row.get_tessellation_cost()
+            if tessellation_cost is not None:
+                self.__ui_list_polygons.setCellWidget(row_index, 9, RendererDiagnosis.__create_color_cell(
+                    self.__list_maxima["tessellation_cost"], tessellation_cost,
+                    RendererDiagnosis.format_bytes(tessellation_cost)))
+            # Texture memory
+            texture_memory = row.get_texture_memory()
+            if texture_memory is not None:
+                self.__ui_list_polygons.setCellWidget(row_index, 10, RendererDiagnosis.__create_color_cell(
+                    self.__list_maxima["texture_memory"], texture_memory,
+                    RendererDiagnosis.format_bytes(texture_memory)))
+            row_index += 1
+
+    def __refresh_duplicates(self):
+        """
+        Refresh the list of the groups of identical meshes
+        :return:
+        """
+        self.__ui_duplicates.setRowCount(0)
+        duplicate_groups = self.__scene_diagnosis.get_duplicate_groups()
+        max_wasted_memory = duplicate_groups[0]["wasted_memory"] if len(duplicate_groups) > 0 else 0
+        for row_index, group in enumerate(duplicate_groups):
+            paths = group["paths"]
+            maya_objs = []
+            for path in paths:
+                row = self.__result_store.get(path)
+                if row is not None and row.get_maya_obj_name() is not None:
+                    maya_objs.append(row.get_maya_obj_name())
+            self.__ui_duplicates.insertRow(row_index)
+            # Element
+            elem_item = QTableWidgetItem("  " + paths[0])
+            elem_item.setToolTip("\n".join(paths))
+            elem_item.setData(Qt.UserRole, ("\n".join(paths), maya_objs))
+            self.__ui_duplicates.setItem(row_index, 0, elem_item)
+            # Copies
+            copies_item = QTableWidgetItem(str(len(paths)))
+            copies_item.setTextAlignment(Qt.AlignCenter)
+            self.__ui_duplicates.setItem(row_index, 1, copies_item)
             # Polygons
-            polygons_item = QTableWidgetItem(RendererDiagnosis.format_val(polygons))
+            polygons_item = QTableWidgetItem(RendererDiagnosis.format_val(group["polygons"]))
             polygons_item.setTextAlignment(Qt.AlignCenter)
-            self.__ui_list_polygons.setItem(row_index, 4, polygons_item)
-            row_index += 1
+            self.__ui_duplicates.setItem(row_index, 2, polygons_item)
+            # Wasted polygons
+            wasted_polygons_item = QTableWidgetItem(RendererDiagnosis.format_val(group["wasted_polygons"]))
+            wasted_polygons_item.setTextAlignment(Qt.AlignCenter)
+            self.__ui_duplicates.setItem(row_index, 3, wasted_polygons_item)
+            # Wasted memory
+            self.__ui_duplicates.setCellWidget(row_index, 4, RendererDiagnosis.__create_color_cell(
+                max_wasted_memory, group["wasted_memory"], RendererDiagnosis.format_bytes(group["wasted_memory"])))
+
+    def __refresh_textures(self):
+        """
+        Refresh the list of the textures sorted by their memory
+        :return:
+        """
+        self.__ui_textures.setRowCount(0)
+        objs_by_texture = {}
+        for maya_obj_name, textures in self.__scene_diagnosis.get_textures_by_obj().items():
+            for texture in textures:
+                objs_by_texture.setdefault(texture, []).append(maya_obj_name)
+        headers = sorted(self.__scene_diagnosis.get_texture_headers().items(), key=lambda item: item[1]["memory"],
+                         reverse=True)
+        max_memory = headers[0][1]["memory"] if len(headers) > 0 else 0
+        for row_index, (path, header) in enumerate(headers):
+            self.__ui_textures.insertRow(row_index)
+            # Texture
+            texture_item = QTableWidgetItem("  " + path)
+            texture_item.setToolTip(path)
+            texture_item.setData(Qt.UserRole, (path, objs_by_texture.get(path, [])))
+            self.__ui_textures.setItem(row_index, 0, texture_item)
+            # Resolution, channels, bit depth, tiled and mips
+            for column, text in enumerate([str(header["width"]) + " x " + str(header["height"]),
+                                           str(header["channels"]), str(header["bit_depth"]),
+                                           "Yes" if header["tiled"] else "No", str(header["mip_levels"])], 1):
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignCenter)
+                self.__ui_textures.setItem(row_index, column, item)
+            # Memory
+            self.__ui_textures.setCellWidget(row_index, 6, RendererDiagnosis.__create_color_cell(
+                max_memory, header["memory"], RendererDiagnosis.format_bytes(header["memory"])))
+
+    def __set_tree_item_values(self, ui_item, node):
+        """
+        Fill the columns of an item of the tree with the values of its node
+        :param ui_item
+        :param node
+        :return:
+        """
+        stylesheet_padding = "padding-right:20px; padding-top:5px; padding-bottom:5px"
+        scene_polygons = self.__tree_values["polygons"][ROOT_NODE]
+        polygons = int(self.__tree_values["polygons"][node])
+
+        def __set_label(column, text):
+            """
+            Display a text in a column or clear it
+            :param column
+            :param text: None to clear the column
+            :return:
+            """
+            if text is None:
+                self.__ui_tree_polygons.removeItemWidget(ui_item, column)
+                return
+            label = QLabel(text)
+            label.setStyleSheet(stylesheet_padding)
+            label.setFont(self.__ui_font)
+            label.setAlignment(Qt.AlignRight)
+            self.__ui_tree_polygons.setItemWidget(ui_item, column, label)
+
+        # Color
+        if node != ROOT_NODE:
+            self.__ui_tree_polygons.setItemWidget(ui_item, 1, RendererDiagnosis.__create_color_cell(
+                scene_polygons, polygons, str(round(polygons * 100 / scene_polygons, 1)) + "%"))
+        # Number of polygons
+        __set_label(2, RendererDiagnosis.format_val(polygons))
+        # Number of polygons outside of the camera
+        off_camera_polygons = int(self.__tree_values["off_camera_polygons"][node])
+        __set_label(3, RendererDiagnosis.format_val(off_camera_polygons) if off_camera_polygons > 0 else None)
+        # Estimated tessellation
+        micropolygons = self.__tree_values["micropolygons"][node]
+        __set_label(4, RendererDiagnosis.format_val(round(micropolygons)) if micropolygons > 0 else None)
+        __set_label(5, RendererDiagnosis.format_bytes(self.__tree_values["tessellation_cost"][node])
+                    if micropolygons > 0 else None)
+        # Texture memory
+        if node in self.__tree_textures:
+            nb_textures, texture_memory = self.__tree_textures[node]
+            __set_label(6, RendererDiagnosis.format_bytes(texture_memory))
+            self.__ui_tree_polygons.itemWidget(ui_item, 6).setToolTip(str(nb_textures) + " textures")
+        else:
+            __set_label(6, None)
 
     def __refresh_tree(self):
         """
         Refresh the tree displaying the hierarchy of the scene with their size
         :return:
         """
+        self.__ui_tree_polygons.clear()
+        self.__tree_ui_items.clear()
+        if self.__tree_values is None: return
+        path_tree = self.__result_store.get_path_tree()
+        polygons = self.__tree_values["polygons"]
 
-        if self.__tree_obj_poly is None: return
-        scene_polygons = self.__tree_obj_poly.get_polygons()
-        stylesheet_padding = "padding-right:20px; padding-top:5px; padding-bottom:5px"
-
-        def __build_ui_tree_polygons(ui_item, tree_item, expand=False):
+        def __build_ui_tree_polygons(ui_item, node, expand=False):
             """
-            Create recursively the ui tree. if an element is expanded then the parent has to be expanded
+            Create recursively the ui tree. if an element is expanded then the parent has to be expanded. The children
+            are sorted to have the bigger first
             :param ui_item
-            :param tree_item
+            :param node
             :param expand: force expand
             :return: expand
             """
-            children = tree_item.get_children()
+            children = sorted(path_tree.get_children(node), key=lambda child: polygons[child], reverse=True)
             expand |= len(children) > 1
-            for child in tree_item.get_children():
-                polygons = child.get_polygons()
-                path = child.get_path()
+            for child in children:
+                path = path_tree.get_path(child)
                 ui_child = QtWidgets.QTreeWidgetItem(ui_item)
                 ui_child.setToolTip(0, path)
-                ui_child.setData(0, Qt.UserRole, (path, child.get_maya_objs()))
+                if path in self.__budget_violations:
+                    ui_child.setBackground(0, QColor(*_VIOLATION_COLOR))
+                    ui_child.setToolTip(0, path + "\n" + "\n".join(self.__budget_violations[path]))
+                ui_child.setData(0, Qt.UserRole, child)
+                self.__tree_ui_items[child] = ui_child
                 expand |= __build_ui_tree_polygons(ui_child, child)
 
                 ui_child.setFont(0, self.__ui_font)
                 # Name
-                ui_child.setText(0, child.get_name())
-                # Color
-                r, g, b = RendererDiagnosis.val_to_color(scene_polygons, polygons)
-                icon_widget_wrapper = QWidget()
-                icon_widget = QWidget()
-                icon_widget.setStyleSheet("background-color:rgb(" + str(r) + "," + str(g) + "," + str(b) + ");")
-                icon_widget.setFixedSize(QSize(12, 12))
-                icon_layout = QHBoxLayout()
-                icon_layout.setContentsMargins(0, 0, 20, 0)
-                icon_layout.addStretch()
-                icon_layout.addWidget(QLabel(str(round(polygons * 100 / scene_polygons, 1)) + "%"))
-                icon_layout.addWidget(icon_widget)
-                icon_widget_wrapper.setLayout(icon_layout)
-                self.__ui_tree_polygons.setItemWidget(ui_child, 1, icon_widget_wrapper)
-                # Number of polygons
-                label_polygons = QLabel(RendererDiagnosis.format_val(polygons))
-                label_polygons.setStyleSheet(stylesheet_padding)
-                label_polygons.setFont(self.__ui_font)
-                label_polygons.setAlignment(Qt.AlignRight)
-                self.__ui_tree_polygons.setItemWidget(ui_child, 2, label_polygons)
+                ui_child.setText(0, path_tree.get_name(child))
+                self.__set_tree_item_values(ui_child, child)
             ui_item.setExpanded(expand)
             return expand
 
-        self.__ui_tree_polygons.clear()
-        if self.__tree_obj_poly is None: return
         # Root
         root = QtWidgets.QTreeWidgetItem(self.__ui_tree_polygons)
-        root.setData(0, Qt.UserRole, (self.__tree_obj_poly.get_path(), self.__tree_obj_poly.get_maya_objs()))
+        root.setData(0, Qt.UserRole, ROOT_NODE)
+        self.__tree_ui_items[ROOT_NODE] = root
         root.setFont(0, self.__ui_font)
-        root.setText(0, self.__tree_obj_poly.get_name())
-        label_polygons = QLabel(RendererDiagnosis.format_val(scene_polygons))
-        label_polygons.setStyleSheet(stylesheet_padding)
-        label_polygons.setAlignment(Qt.AlignRight)
-        label_polygons.setFont(self.__ui_font)
-        self.__ui_tree_polygons.setItemWidget(root, 2, label_polygons)
+        root.setText(0, "root")
+        if "/" in self.__budget_violations:
+            root.setBackground(0, QColor(*_VIOLATION_COLOR))
+            root.setToolTip(0, "\n".join(self.__budget_violations["/"]))
         self.__ui_tree_polygons.addTopLevelItem(root)
-        __build_ui_tree_polygons(root, self.__tree_obj_poly, True)
+        self.__set_tree_item_values(root, ROOT_NODE)
+        __build_ui_tree_polygons(root, ROOT_NODE, True)
 
     def __on_diagnose_hidden_element_checked(self, state):
         """
@@ -615,249 +863,324 @@ class RendererDiagnosis(QDialog):
         """
         self.__diagnose_hidden_element = state != Qt.Unchecked
 
-    def __on_clicked_header_list(self, index):
+    def __on_read_standins_files_checked(self, state):
         """
-        Change the sorting of the list on click on the header of the list
-        :param index: index column
+        Retrieve the checkbox state
+        :param state
         :return:
         """
-        if index in [1,2,3,4]:
-            if self.__list_sort.get_index() == index:
-                self.__list_sort.toggle_order()
-            else:
-                self.__list_sort.set_index(index)
-                self.__list_sort.set_order(True)
-            self.__refresh_list()
-        self.__refresh_list_sorting()
+        self.__read_standins_files = state != Qt.Unchecked
 
-    def __fix_auto_instancing(self):
+    def __on_find_duplicates_checked(self, state):
         """
-        Set the autoInstancing attribute to False because it doesn't works with export with expandProcedural
+        Retrieve the checkbox state
+        :param state
         :return:
         """
-        standins = pm.ls(type="aiStandIn")
-        self.__standins_auto_instance.clear()
-        for standin in standins:
-            if standin.useAutoInstancing.get() == 1:
-                self.__standins_auto_instance.append(standin)
-                standin.useAutoInstancing.set(0)
+        self.__find_duplicates = state != Qt.Unchecked
 
-    def __restore_auto_instancing(self):
+    def __on_diagnose_textures_checked(self, state):
         """
-        Restore the autoInstancing
+        Retrieve the checkbox state
+        :param state
         :return:
         """
-        for standin in self.__standins_auto_instance:
-            standin.useAutoInstancing.set(1)
-        self.__standins_auto_instance.clear()
+        self.__diagnose_textures = state != Qt.Unchecked
 
-    def __show_objects(self):
+    def __on_frustum_margin_changed(self, value):
         """
-        Show all the objects in the DAG
+        Retrieve the frustum margin
+        :param value: margin in percent
         :return:
         """
-        self.__hidden_objects.clear()
-        all_objects = pm.ls(dagObjects=True)
-        for obj in all_objects:
-            if not obj.visibility.get():
-                self.__hidden_objects.append(obj)
-                obj.visibility.set(1)
+        self.__frustum_margin = value / 100
 
-    def __restore_hidden_objects(self):
+    def __on_live_checked(self, state):
         """
-        Hide the objects that were hidden
+        Start or stop the live monitoring of the meshes
+        :param state
         :return:
         """
-        for obj in self.__hidden_objects:
-            obj.visibility.set(0)
-        self.__hidden_objects.clear()
+        if state != Qt.Unchecked:
+            if self.__tree_values is None:
+                self.__compute_tree()
+            self.__start_live()
+            self.__ui_live_lbl.show()
+        else:
+            self.__live_monitor.stop()
+            self.__ui_live_lbl.hide()
 
-    def __export_ass(self, selected=False):
+    def __start_live(self):
         """
-        Export the scene in a tempfile ass to retrieve all the informations we need
+        Start the live monitoring on the scope of the last diagnosis or on the scene if there was none
         :return:
         """
-        diagnose_hidden_objects = self.__diagnose_hidden_element
-        if diagnose_hidden_objects: self.__show_objects()
-        if selected:
-            pm.select(pm.ls(selection=True, dagObjects=True))
+        if self.__diagnosed_selected is None:
+            self.__live_monitor.start(None, self.__diagnose_hidden_element)
         else:
-            pm.select(pm.ls(dagObjects=True))
-
-        command_1 = 'file -force -options "-mask 6399;-lightLinks 1;-shadowLinks 1;-expandProcedurals;-fullPath" ' \
-                    '-type "ASS Export" -pr -es "' + self.__temp_path + '"; '
-        command_2 = 'arnoldExportAss -f "' + self.__temp_path + '" -s -boundingBox -mask 6399 -lightLinks 1 -shadowLinks 1 ' \
-                                                                '-expandProcedurals -fullPath -cam perspShape; '
-        self.__fix_auto_instancing()
-        try:
-            pm.mel.eval(command_1)
-            pm.mel.eval(command_2)
-        except:
-            os.remove(self.__temp_path)
-            print_warning("Error while exporting as ASS file")
-        self.__restore_auto_instancing()
-        if diagnose_hidden_objects: self.__restore_hidden_objects()
-        pm.select([])
+            # Only the meshes diagnosed are followed, and the meshes created if the whole scene was diagnosed
+            self.__live_monitor.start(self.__result_store.__contains__, True, not self.__diagnosed_selected)
+        # The elements already diagnosed keep their values, only the meshes missing in the result are added
+        self.__on_live_meshes_changed({path: count for path, count in self.__live_monitor.get_counts().items()
+                                       if path not in self.__result_store})
 
-    def __on_list_item_selected(self):
+    def __on_live_meshes_changed(self, changes):
         """
-        On selection in the table changed
+        Update the result with the meshes recounted then the budget, the hierarchy and the list. Only the items of the
+        changed branches are refreshed unless elements have been added or removed or the violating elements changed
+        :param changes: dict of the path to (polygons, subdivisions, maya object name) or None if removed
         :return:
         """
-        rows = self.__ui_list_polygons.selectionModel().selectedRows()
-        if len(rows) > 0:
-            path, maya_objs = self.__ui_list_polygons.item(rows[0].row(), 0).data(Qt.UserRole)
-            pm.select(maya_objs)
-            QApplication.clipboard().setText(path)
+        structure_changed = False
+        deltas = {}
+        for path, data in changes.items():
+            if data is None:
+                if path not in self.__result_store: continue
+                self.__result_store.remove(path)
+                structure_changed = True
+                continue
+            polygons, subdiv_iterations, maya_obj_name = data
+            previous = self.__result_store.get(path)
+            if previous is None:
+                self.__result_store.set(path, polygons, subdiv_iterations, None, maya_obj_name)
+                structure_changed = True
+                continue
+            previous_polygons = previous.get_polygons()
+            if previous_polygons == polygons and previous.get_subdivisions() == subdiv_iterations: continue
+            # The values proportional to the polygons count are rescaled and the other columns are kept
+            values = {"polygons": polygons, "subdiv": subdiv_iterations, "dist_poly": None, "screen_density": None}
+            if previous_polygons > 0:
+                for name, value in (("dist_poly", previous.get_dist_poly()),
+                                    ("screen_density", previous.get_screen_density())):
+                    if value is not None:
+                        values[name] = value / previous_polygons * polygons
+            self.__result_store.update(path, **values)
+            delta = polygons - previous_polygons
+            deltas[path] = (delta, delta if previous.get_frustum() == FRUSTUM_OUTSIDE else 0)
+
+        previous_violations = set(self.__budget_violations)
+        self.__evaluate_budget()
+        self.__refresh_budget()
+        if structure_changed or set(self.__budget_violations) != previous_violations:
+            self.__compute_tree()
+            self.__refresh_list()
+            self.__refresh_tree()
+        else:
+            self.__refresh_live_branches(deltas)
+        self.__refresh_live_summary()
 
-    def __on_tree_item_selected(self):
+    def __refresh_live_branches(self, deltas):
         """
-        On selection in the tree changed select the maya object and copy the path to the clipboard
+        Propagate the polygons recounted to the ancestors of the elements and refresh their items in the hierarchy and
+        their rows in the list
+        :param deltas: dict of the path to the difference of polygons and of polygons outside of the camera
         :return:
         """
-        items = self.__ui_tree_polygons.selectedItems()
-        if len(items) > 0:
-            path, maya_objs = items[0].data(0, Qt.UserRole)
-            pm.select(maya_objs)
-            QApplication.clipboard().setText(path)
+        path_tree = self.__result_store.get_path_tree()
+        changed_nodes = set()
+        for path, (delta, off_camera_delta) in deltas.items():
+            node = self.__result_store.get_node(path)
+            while node >= 0:
+                self.__tree_values["polygons"][node] += delta
+                self.__tree_values["off_camera_polygons"][node] += off_camera_delta
+                changed_nodes.add(node)
+                node = path_tree.get_parent(node)
+        for node in changed_nodes:
+            if node in self.__tree_ui_items:
+                self.__set_tree_item_values(self.__tree_ui_items[node], node)
+
+        rows = [self.__result_store.get(path) for path in deltas]
+        if any(row.get_polygons() > self.__list_maxima["polygons"] or
+               (row.get_dist_poly() or 0) > self.__list_maxima["dist_poly"] or
+               (row.get_screen_density() or 0) > self.__list_maxima["screen_density"] for row in rows):
+            # The colors of all the rows are relative to the max values
+            self.__refresh_list()
+        else:
+            for row in rows:
+                if row.get_path() in self.__list_rows:
+                    self.__set_list_polygons_cells(self.__list_rows[row.get_path()], row)
+
+        # The values in the violations tooltips changed
+        for path, violations in self.__budget_violations.items():
+            tooltip = path + "\n" + "\n".join(violations)
+            node = self.__result_store.get_node(path) if path != "/" else ROOT_NODE
+            if node is not None and node in self.__tree_ui_items:
+                self.__tree_ui_items[node].setToolTip(0, tooltip if node != ROOT_NODE else "\n".join(violations))
+            if path in self.__list_rows:
+                self.__ui_list_polygons.item(self.__list_rows[path], 0).setToolTip(tooltip)
+
+    def __refresh_live_summary(self):
+        """
+        Refresh the running total of the scene and the biggest elements
+        :return:
+        """
+        scene_polygons = self.__tree_values["polygons"][ROOT_NODE] if self.__tree_values is not None else 0
+        top_offenders = self.__result_store.nlargest(_NB_LIVE_TOP_OFFENDERS, "polygons")
+        text = "Scene total : " + RendererDiagnosis.format_val(scene_polygons) + " polygons"
+        if len(top_offenders) > 0:
+            text += "    |    Top : " + ", ".join(
+                [row.get_path().split("/")[-1] + " (" + RendererDiagnosis.format_val(row.get_polygons()) + ")"
+                 for row in self.__result_store.rows(top_offenders)])
+        self.__ui_live_lbl.setText(text)
 
-    def __retrieve_polygons(self):
+    def __load_budget(self, budget_path):
         """
-        Retrieve some datas in the ASS file exported. Retrieve the polygon count and the subdivision count for each
-        polymesh and curves
+        Load the budget rules of a config file
+        :param budget_path
         :return:
         """
-        self.__dict_obj_poly.clear()
-
-        camera_trsf = None
-        cameras = pm.ls(cameras=True)
-        for camera in cameras:
-            if pm.getAttr(camera + '.renderable'):
-                camera_trsf = camera.getTransform()
-                break
-
-        AiASSLoad(self.__temp_path)
-        univ = AiUniverseGetNodeIterator(AI_NODE_SHAPE)
-        while not AiNodeIteratorFinished(univ):
-            node = AiNodeIteratorGetNext(univ)
-            node_name = AiNodeGetName(node)
-            if not node_name: continue
-            renderer_diagnosis_dcc = AiNodeGetStr(node, "renderer_diagnosis_dcc")
-            is_polymesh_standin = AiNodeIs(node, "polymesh") and len(renderer_diagnosis_dcc) > 0
-            is_polymesh_mesh = AiNodeIs(node, "polymesh")
-            is_curves = AiNodeIs(node, "curves") and len(renderer_diagnosis_dcc) > 0
-            if is_polymesh_standin or is_polymesh_mesh:
-                nsides = AiArrayGetNumElements(AiNodeGetArray(node, "nsides").contents)
-            elif is_curves:
-                nsides = round(AiArrayGetNumElements(AiNodeGetArray(node, "num_points").contents) / 3.5)
-            else:
-                continue
-
-            subdiv_iterations = AiNodeGetInt(node, "subdiv_iterations")
-            if subdiv_iterations > 0:
-                nsides = nsides * pow(4, subdiv_iterations)
-            else:
-                subdiv_iterations = None
+        try:
+            self.__budget_engine = BudgetEngine.load(budget_path)
+            self.__budget_path = budget_path
+        except (OSError, ValueError) as e:
+            print_warning("Error while loading the budget " + budget_path + " : " + str(e))
+            self.__budget_engine = None
+            self.__budget_path = None
+        self.__budget_verdict = None
+        self.__budget_violations.clear()
+
+    def __on_load_budget(self):
+        """
+        Choose a budget config file and evaluate it on the current result
+        :return:
+        """
+        budget_path, _ = QFileDialog.getOpenFileName(self, "Load budget", self.__budget_path or "",
+                                                     "Budget config (*.json)")
+        if not budget_path: return
+        self.__load_budget(budget_path)
+        if self.__tree_values is not None:
+            self.__evaluate_budget()
+            self.__refresh_list()
+            self.__refresh_tree()
+        self.__refresh_budget()
 
-            if is_polymesh_standin or is_curves:
-                parent = pm.PyNode(renderer_diagnosis_dcc).getParent() \
-                    if pm.objExists(renderer_diagnosis_dcc) else None
-                parent_name = "/" + parent.name() if parent is not None else ""
-            else:
-                parent_request = pm.ls(node_name.replace("/", "|"))
-                parent = parent_request[0].getParent() if len(parent_request) > 0 else None
-                parent_name = ""
+    def __on_export_verdict(self):
+        """
+        Write the verdict of the budget in a JSON file
+        :return:
+        """
+        if self.__budget_verdict is None: return
+        verdict_path, _ = QFileDialog.getSaveFileName(self, "Export verdict", "", "Verdict (*.json)")
+        if not verdict_path: return
+        BudgetEngine.write_verdict(self.__budget_verdict, verdict_path)
 
-            dist_poly = None
-            if camera_trsf is not None and parent is not None:
-                dist = (camera_trsf.getBoundingBox(space="world").center() - parent.getBoundingBox(space="world").center()).length()
-                dist_poly = dist * nsides
+    def __evaluate_budget(self):
+        """
+        Evaluate the budget rules over the whole result
+        :return:
+        """
+        self.__budget_violations.clear()
+        self.__budget_verdict = None
+        if self.__budget_engine is None: return
+        self.__budget_verdict = self.__scene_diagnosis.evaluate_budget(self.__budget_engine)
+        for violation in self.__budget_verdict["violations"]:
+            self.__budget_violations.setdefault(violation["path"], []).append(
+                violation["rule"] + " : " + violation["metric"] + " " + RendererDiagnosis.format_val(
+                    round(violation["value"])) + " > " + RendererDiagnosis.format_val(violation["limit"]))
 
-            if is_curves:
-                name = "/".join((parent_name + node_name).split("/"))
+    def __on_clicked_header_list(self, index):
+        """
+        Change the sorting of the list on click on the header of the list
+        :param index: index column
+        :return:
+        """
+        if index in _LIST_SORT_COLUMNS:
+            if self.__list_sort.get_index() == index:
+                self.__list_sort.toggle_order()
             else:
-                name = "/".join((parent_name + node_name).split("/")[:-1])
-
-            self.__dict_obj_poly[name] = {
-                "polygons": nsides,
-                "maya_obj": parent,
-                "subdiv": subdiv_iterations,
-                "dist_poly": dist_poly
-            }
-        AiNodeIteratorDestroy(univ)
-        AiEnd()
-        AiBegin()
+                self.__list_sort.set_index(index)
+                self.__list_sort.set_order(True)
+            self.__refresh_list()
+        self.__refresh_list_sorting()
 
-    def __build_tree_objects_polygons(self):
+    def __on_list_item_selected(self):
         """
-        Create the tree structure of ElementPolygon
+        On selection in the table changed
         :return:
         """
+        rows = self.__ui_list_polygons.selectionModel().selectedRows()
+        if len(rows) > 0:
+            path, maya_objs = self.__ui_list_polygons.item(rows[0].row(), 0).data(Qt.UserRole)
+            pm.select(maya_objs)
+            QApplication.clipboard().setText(path)
 
-        def __insert_in_tree(tree, obj_path_array, maya_object, polygon_count, nb_subdivisions):
-            """
-            insert in the tree the hierarchy for one leaf
-            :param tree
-            :param obj_path_array
-            :param maya_object
-            :param polygon_count
-            :param nb_subdivisions
-            :return:
-            """
-            path = ""
-            for key in obj_path_array:
-                path += "/" + key
-                tree = tree.add_child(key, path)
-            tree.set_polygons(polygon_count)
-            tree.set_maya_obj(maya_object)
-            tree.set_subdivisions(nb_subdivisions)
-
-        self.__tree_obj_poly = ElementPolygon("root", "/")
-        for obj_path, data in self.__dict_obj_poly.items():
-            objs = obj_path.split('/')[1:]
-            __insert_in_tree(self.__tree_obj_poly, objs, data["maya_obj"], data["polygons"], data["subdiv"])
-
-    def __compute_polygons_parent(self):
+    def __on_duplicates_item_selected(self):
         """
-        Compute values for nodes in the tree that aren't leaves
+        On selection in the duplicates changed select all the maya objects of the group and copy the paths
         :return:
         """
+        rows = self.__ui_duplicates.selectionModel().selectedRows()
+        if len(rows) > 0:
+            paths, maya_objs = self.__ui_duplicates.item(rows[0].row(), 0).data(Qt.UserRole)
+            pm.select(maya_objs)
+            QApplication.clipboard().setText(paths)
 
-        def __compute_polygons(item):
-            """
-            Recursive function to compute values for the whole tree
-            :param item:
-            :return:
-            """
-            children = item.get_children()
-            nb_children = len(children)
-            if nb_children == 0:
-                return
-            polygons = 0
-            for child in item.get_children():
-                __compute_polygons(child)
-                polygons += child.get_polygons()
-            item.set_polygons(polygons)
-
-        __compute_polygons(self.__tree_obj_poly)
-
-    def __sort_tree_recursive(self):
+    def __on_textures_item_selected(self):
         """
-        Sort each children array for each node in the tree
+        On selection in the textures changed select all the maya objects using the texture and copy its path
         :return:
         """
+        rows = self.__ui_textures.selectionModel().selectedRows()
+        if len(rows) > 0:
+            path, maya_objs = self.__ui_textures.item(rows[0].row(), 0).data(Qt.UserRole)
+            pm.select(maya_objs)
+            QApplication.clipboard().setText(path)
 
-        def __sort_tree_recursive_aux(elem):
-            """
-            Recursive function to sort the whole tree
-            :param elem:
-            :return:
-            """
-            elem.sort_children()
-            for child in elem.get_children():
-                __sort_tree_recursive_aux(child)
+    def __on_tree_item_selected(self):
+        """
+        On selection in the tree changed select the maya object and copy the path to the clipboard
+        :return:
+        """
+        items = self.__ui_tree_polygons.selectedItems()
+        if len(items) > 0:
+            node = items[0].data(0, Qt.UserRole)
+            pm.select(self.__result_store.get_node_maya_obj_names(node))
+            QApplication.clipboard().setText(self.__result_store.get_node_path(node))
 
-        __sort_tree_recursive_aux(self.__tree_obj_poly)
+    def __compute_tree(self):
+        """
+        Compute the values of every node of the tree from the result store
+        :return:
+        """
+        store = self.__result_store
+        polygons = store.column("polygons")
+        self.__tree_values = {
+            "polygons": store.aggregate(polygons),
+            "off_camera_polygons": store.aggregate(np.where(store.column("frustum") == FRUSTUM_OUTSIDE, polygons, 0)),
+            "micropolygons": store.aggregate(store.column("micropolygons")),
+            "tessellation_cost": store.aggregate(store.column("tessellation_cost")),
+        }
+
+        # A texture shared by several children is loaded once so the sets are merged instead of summed. The children
+        # of a same object share the same set which is reused as is
+        textures_by_obj = self.__scene_diagnosis.get_textures_by_obj()
+        texture_headers = self.__scene_diagnosis.get_texture_headers()
+        path_tree = store.get_path_tree()
+        depths = path_tree.depths()
+        textures_by_node = {}
+        nodes_by_depth = {}
+        for index in range(len(store)):
+            textures = textures_by_obj.get(store.get_value("maya_obj", index))
+            if not textures: continue
+            node = store.get_row_node(index)
+            textures_by_node[node] = textures
+            nodes_by_depth.setdefault(int(depths[node]), []).append(node)
+        for depth in range(max(nodes_by_depth) if len(nodes_by_depth) > 0 else 0, 0, -1):
+            children_textures_by_parent = {}
+            for node in nodes_by_depth.get(depth, []):
+                children_textures_by_parent.setdefault(path_tree.get_parent(node), {})[
+                    id(textures_by_node[node])] = textures_by_node[node]
+            for parent, children_textures in children_textures_by_parent.items():
+                if parent in textures_by_node:
+                    children_textures[id(textures_by_node[parent])] = textures_by_node[parent]
+                else:
+                    nodes_by_depth.setdefault(depth - 1, []).append(parent)
+                children_textures = list(children_textures.values())
+                textures_by_node[parent] = children_textures[0] if len(children_textures) == 1 \
+                    else frozenset().union(*children_textures)
+        self.__tree_textures = {
+            node: (len(textures), sum([texture_headers[path]["memory"] for path in textures]))
+            for node, textures in textures_by_node.items()}
 
     def __diagnose(self, selected=False):
         """
@@ -865,11 +1188,24 @@ class RendererDiagnosis(QDialog):
         :param selected: diagnose only selected
         :return:
         """
-        self.__set_dcc_for_standins()
-        self.__export_ass(selected)
-        self.__retrieve_polygons()
-        self.__build_tree_objects_polygons()
-        self.__compute_polygons_parent()
-        self.__sort_tree_recursive()
+        self.__scene_diagnosis.set_diagnose_hidden_element(self.__diagnose_hidden_element)
+        self.__scene_diagnosis.set_read_standins_files(self.__read_standins_files)
+        self.__scene_diagnosis.set_frustum_margin(self.__frustum_margin)
+        self.__scene_diagnosis.set_find_duplicates(self.__find_duplicates)
+        self.__scene_diagnosis.set_diagnose_textures(self.__diagnose_textures)
+        try:
+            self.__scene_diagnosis.diagnose(selected)
+        except DiagnosisError as e:
+            print_warning(str(e))
+        self.__diagnosed_selected = selected
+        self.__compute_tree()
+        self.__evaluate_budget()
+        self.__refresh_budget()
         self.__refresh_list()
         self.__refresh_tree()
+        self.__refresh_duplicates()
+        self.__refresh_textures()
+        if self.__live_monitor.is_active():
+            # The scope followed live is the one of the new diagnosis
+            self.__live_monitor.stop()
+            self.__start_live()
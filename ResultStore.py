@@ -0,0 +1,664 @@
+from array import array
+
+import numpy as np
+
+# ######################################################################################################################
+
+# Numeric columns : name -> (array typecode, numpy dtype, value when unknown)
+_COLUMNS = {
+    "polygons": ("q", np.int64, 0),
+    "subdiv": ("b", np.int8, -1),
+    "dist_poly": ("d", np.float64, np.nan),
+    "screen_density": ("d", np.float64, np.nan),
+    "frustum": ("b", np.int8, -1),
+    "subdiv_type": ("b", np.int8, -1),
+    "adaptive_error": ("d", np.float64, np.nan),
+    "adaptive_metric": ("b", np.int8, -1),
+    "adaptive_space": ("b", np.int8, -1),
+    "disp_padding": ("d", np.float64, np.nan),
+    "displaced": ("b", np.int8, -1),
+    "micropolygons": ("d", np.float64, np.nan),
+    "tessellation_cost": ("d", np.float64, np.nan),
+    "texture_memory": ("d", np.float64, np.nan),
+}
+# World bounding box stored as min x, min y, min z, max x, max y, max z
+_BBOX_SIZE = 6
+# Index of the maya object of a row when it is the transform of the row path (native meshes)
+_MAYA_OBJ_FROM_PATH = -2
+ROOT_NODE = 0
+_EMPTY_SLOT = -1
+_MIN_SLOTS = 1024
+
+
+# ######################################################################################################################
+
+class PathTree:
+    def __init__(self):
+        """
+        Constructor. Each level of a path is a node keeping its parent and its name, so the levels shared by several
+        paths are stored once. The names are packed in one buffer and the nodes are found with an open addressing
+        table on (parent, name) instead of a dict per node
+        """
+        self.__names = bytearray()
+        self.__name_offsets = array("q", [0, 0])
+        self.__hashes = array("q", [0])
+        self.__parents = array("i", [-1])
+        self.__depths = array("B", [0])
+        self.__first_children = array("i", [-1])
+        self.__next_siblings = array("i", [-1])
+        self.__slots = array("i", [_EMPTY_SLOT]) * _MIN_SLOTS
+
+    def __len__(self):
+        """
+        Number of nodes, the root and the detached nodes included
+        :return: length
+        """
+        return len(self.__parents)
+
+    def __get_name_bytes(self, node):
+        """
+        Get the encoded name of a node
+        :param node
+        :return: name bytes
+        """
+        return self.__names[self.__name_offsets[node]:self.__name_offsets[node + 1]]
+
+    def __grow_slots(self):
+        """
+        Double the size of the table of the nodes
+        :return:
+        """
+        slots = array("i", [_EMPTY_SLOT]) * (len(self.__slots) * 2)
+        mask = len(slots) - 1
+        for node in range(1, len(self.__parents)):
+            if self.__parents[node] < 0: continue
+            slot = self.__hashes[node] & mask
+            while slots[slot] != _EMPTY_SLOT:
+                slot = (slot + 1) & mask
+            slots[slot] = node
+        self.__slots = slots
+
+    def __find_child(self, parent, name, create):
+        """
+        Find the child of a node by its name
+        :param parent
+        :param name: name bytes
+        :param create: create the child if it doesn't exist
+        :return: node (None if it doesn't exist)
+        """
+        key_hash = hash((parent, name))
+        mask = len(self.__slots) - 1
+        slot = key_hash & mask
+        while True:
+            node = self.__slots[slot]
+            if node == _EMPTY_SLOT: break
+            if self.__hashes[node] == key_hash and self.__parents[node] == parent and \
+                    self.__get_name_bytes(node) == name:
+                return node
+            slot = (slot + 1) & mask
+        if not create: return None
+        node = len(self.__parents)
+        self.__names.extend(name)
+        self.__name_offsets.append(len(self.__names))
+        self.__hashes.append(key_hash)
+        self.__parents.append(parent)
+        self.__depths.append(self.__depths[parent] + 1)
+        self.__first_children.append(-1)
+        self.__next_siblings.append(self.__first_children[parent])
+        self.__first_children[parent] = node
+        self.__slots[slot] = node
+        if len(self.__parents) * 2 > len(self.__slots):
+            self.__grow_slots()
+        return node
+
+    def find(self, path, create=False):
+        """
+        Find the node of a path
+        :param path
+        :param create: create the missing nodes
+        :return: node (None if it doesn't exist)
+        """
+        node = ROOT_NODE
+        for name in path.split("/")[1:]:
+            node = self.__find_child(node, name.encode(), create)
+            if node is None: return None
+        return node
+
+    def detach(self, node):
+        """
+        Remove a node from the children of its parent. It can't be found anymore
+        :param node
+        :return:
+        """
+        parent = self.__parents[node]
+        if parent < 0: return
+        if self.__first_children[parent] == node:
+            self.__first_children[parent] = self.__next_siblings[node]
+        else:
+            sibling = self.__first_children[parent]
+            while self.__next_siblings[sibling] != node:
+                sibling = self.__next_siblings[sibling]
+            self.__next_siblings[sibling] = self.__next_siblings[node]
+        self.__parents[node] = -1
+        self.__next_siblings[node] = -1
+
+    def get_name(self, node):
+        """
+        Getter of the name of a node
+        :param node
+        :return: name
+        """
+        return self.__get_name_bytes(node).decode()
+
+    def get_parent(self, node):
+        """
+        Getter of the parent of a node
+        :param node
+        :return: parent (-1 for the root and the detached nodes)
+        """
+        return self.__parents[node]
+
+    def get_path(self, node):
+        """
+        Build the path of a node
+        :param node
+        :return: path
+        """
+        if node == ROOT_NODE: return "/"
+        names = []
+        while node > ROOT_NODE:
+            names.append(self.get_name(node))
+            node = self.__parents[node]
+        return "/" + "/".join(reversed(names))
+
+    def get_children(self, node):
+        """
+        Getter of the children of a node
+        :param node
+        :return: child nodes
+        """
+        children = []
+        child = self.__first_children[node]
+        while child >= 0:
+            children.append(child)
+            child = self.__next_siblings[child]
+        return children
+
+    def has_children(self, node):
+        """
+        Check whether a node has children
+        :param node
+        :return: has children
+        """
+        return self.__first_children[node] >= 0
+
+    def parents(self):
+        """
+        Get the parent of every node without copy
+        :return: array
+        """
+        return np.frombuffer(self.__parents, dtype=np.int32)
+
+    def depths(self):
+        """
+        Get the depth of every node without copy
+        :return: array
+        """
+        return np.frombuffer(self.__depths, dtype=np.uint8)
+
+
+class ResultRow:
+    __slots__ = ("__store", "__index")
+
+    def __init__(self, store, index):
+        """
+        Constructor
+        :param store
+        :param index: index of the row in the store
+        """
+        self.__store = store
+        self.__index = index
+
+    def get_index(self):
+        """
+        Getter of the index in the store
+        :return: index
+        """
+        return self.__index
+
+    def get_path(self):
+        """
+        Getter of the path
+        :return: path
+        """
+        return self.__store.get_value("path", self.__index)
+
+    def get_polygons(self):
+        """
+        Getter of the polygons count
+        :return: polygons count
+        """
+        return self.__store.get_value("polygons", self.__index)
+
+    def get_subdivisions(self):
+        """
+        Getter of the subdivisions
+        :return: subdivisions (None if not subdivided)
+        """
+        return self.__store.get_value("subdiv", self.__index)
+
+    def get_dist_poly(self):
+        """
+        Getter of the distance multiplied by the polygons count
+        :return: dist poly (None if unknown)
+        """
+        return self.__store.get_value("dist_poly", self.__index)
+
+    def get_screen_density(self):
+        """
+        Getter of the polygons per pixel covered on the render camera
+        :return: screen density (None if unknown or not visible)
+        """
+        return self.__store.get_value("screen_density", self.__index)
+
+    def get_frustum(self):
+        """
+        Getter of the position relative to the camera frustum
+        :return: frustum state (None if unknown)
+        """
+        return self.__store.get_value("frustum", self.__index)
+
+    def is_displaced(self):
+        """
+        Getter of whether a displacement shader is assigned
+        :return: is displaced
+        """
+        return self.__store.get_value("displaced", self.__index) == 1
+
+    def get_micropolygons(self):
+        """
+        Getter of the estimated polygons count after tessellation
+        :return: micropolygons (None if unknown)
+        """
+        return self.__store.get_value("micropolygons", self.__index)
+
+    def get_tessellation_cost(self):
+        """
+        Getter of the estimated memory of the tessellated shape
+        :return: cost in bytes (None if unknown)
+        """
+        return self.__store.get_value("tessellation_cost", self.__index)
+
+    def get_texture_memory(self):
+        """
+        Getter of the estimated memory of the textures used by the maya object linked
+        :return: texture memory in bytes (None if unknown)
+        """
+        return self.__store.get_value("texture_memory", self.__index)
+
+    def get_maya_obj_name(self):
+        """
+        Getter of the name of the maya object linked
+        :return: maya object name (None if there is none)
+        """
+        return self.__store.get_value("maya_obj", self.__index)
+
+
+class ResultStore:
+    @staticmethod
+    def __path_to_maya_name(path):
+        """
+        Get the name of the maya object of a path
+        :param path
+        :return: maya object name
+        """
+        return path.replace("/", "|")
+
+    def __init__(self):
+        """
+        Constructor. The paths are stored in a tree of their levels and the rows are linked to the nodes
+        """
+        self.__path_tree = PathTree()
+        self.__node_rows = array("i", [-1])
+        self.__row_nodes = array("i")
+        # Only the maya objects that aren't the transform of the row path (stand-ins) are kept in a table
+        self.__maya_obj_names = []
+        self.__maya_obj_indices = {}
+        self.__maya_objs = array("i")
+        self.__bboxes = array("d")
+        self.__columns = {name: array(typecode) for name, (typecode, _, _) in _COLUMNS.items()}
+
+    def __len__(self):
+        """
+        Number of rows
+        :return: length
+        """
+        return len(self.__row_nodes)
+
+    def __contains__(self, path):
+        """
+        Check whether a row exists for the path
+        :param path
+        :return: contains
+        """
+        node = self.__find_node(path)
+        return node is not None and self.__node_rows[node] >= 0
+
+    def __find_node(self, path, create=False):
+        """
+        Find the node of a path
+        :param path
+        :param create: create the missing nodes
+        :return: node (None if it doesn't exist)
+        """
+        node = self.__path_tree.find(path, create)
+        if create and len(self.__node_rows) < len(self.__path_tree):
+            self.__node_rows.extend(array("i", [-1]) * (len(self.__path_tree) - len(self.__node_rows)))
+        return node
+
+    def clear(self):
+        """
+        Remove all the rows
+        :return:
+        """
+        self.__init__()
+
+    def set(self, path, polygons, subdivisions, dist_poly, maya_obj, bbox=None, **values):
+        """
+        Add a row or replace the row of the same path. The columns not given are reset
+        :param path
+        :param polygons
+        :param subdivisions: None if not subdivided
+        :param dist_poly: None if unknown
+        :param maya_obj: maya object or its name (None if there is none)
+        :param bbox: world bounding box (min x, min y, min z, max x, max y, max z), None if unknown
+        :param values: values of the other numeric columns
+        :return: row
+        """
+        values = dict({name: default for name, (_, _, default) in _COLUMNS.items()}, **values)
+        values["polygons"] = polygons
+        if subdivisions is not None:
+            values["subdiv"] = subdivisions
+        if dist_poly is not None:
+            values["dist_poly"] = dist_poly
+        maya_obj_index = self.__get_maya_obj_index(path, maya_obj)
+        bbox = [np.nan] * _BBOX_SIZE if bbox is None else bbox
+        node = self.__find_node(path, True)
+        index = self.__node_rows[node]
+        if index < 0:
+            index = len(self.__row_nodes)
+            self.__row_nodes.append(node)
+            self.__node_rows[node] = index
+            self.__maya_objs.append(maya_obj_index)
+            self.__bboxes.extend(bbox)
+            for name, column in self.__columns.items():
+                column.append(values[name])
+        else:
+            self.__maya_objs[index] = maya_obj_index
+            self.__bboxes[index * _BBOX_SIZE:(index + 1) * _BBOX_SIZE] = array("d", bbox)
+            for name, column in self.__columns.items():
+                column[index] = values[name]
+        return ResultRow(self, index)
+
+    def update(self, path, **values):
+        """
+        Change some numeric columns of the row of a path. The other columns are kept
+        :param path
+        :param values: values of the numeric columns (None if unknown)
+        :return: row (None if there is no row for the path)
+        """
+        node = self.__find_node(path)
+        if node is None or self.__node_rows[node] < 0: return None
+        index = self.__node_rows[node]
+        for name, value in values.items():
+            if name not in self.__columns:
+                raise KeyError(name)
+            self.__columns[name][index] = _COLUMNS[name][2] if value is None else value
+        return ResultRow(self, index)
+
+    def remove(self, path):
+        """
+        Remove the row of the path by moving the last row in its place. The nodes left without row nor children are
+        detached from the tree
+        :param path
+        :return:
+        """
+        node = self.__find_node(path)
+        if node is None or self.__node_rows[node] < 0: return
+        index = self.__node_rows[node]
+        self.__node_rows[node] = -1
+        last_index = len(self.__row_nodes) - 1
+        columns = [self.__row_nodes, self.__maya_objs] + list(self.__columns.values())
+        if index != last_index:
+            for column in columns:
+                column[index] = column[last_index]
+            self.__node_rows[self.__row_nodes[index]] = index
+            self.__bboxes[index * _BBOX_SIZE:(index + 1) * _BBOX_SIZE] = \
+                self.__bboxes[last_index * _BBOX_SIZE:(last_index + 1) * _BBOX_SIZE]
+        for column in columns:
+            column.pop()
+        del self.__bboxes[last_index * _BBOX_SIZE:]
+        while node != ROOT_NODE and self.__node_rows[node] < 0 and not self.__path_tree.has_children(node):
+            parent = self.__path_tree.get_parent(node)
+            self.__path_tree.detach(node)
+            node = parent
+
+    def get(self, path):
+        """
+        Get the row of a path
+        :param path
+        :return: row (None if it doesn't exist)
+        """
+        node = self.__find_node(path)
+        if node is None or self.__node_rows[node] < 0: return None
+        return ResultRow(self, self.__node_rows[node])
+
+    def row(self, index):
+        """
+        Get the row at the index
+        :param index
+        :return: row
+        """
+        return ResultRow(self, index)
+
+    def rows(self, indices=None):
+        """
+        Iterate over the rows
+        :param indices: order of the rows (all the rows in the store order if None)
+        :return: rows
+        """
+        if indices is None:
+            indices = range(len(self.__row_nodes))
+        for index in indices:
+            yield ResultRow(self, int(index))
+
+    def get_paths(self):
+        """
+        Build the paths of all the rows
+        :return: paths
+        """
+        return [self.get_node_path(node) for node in self.__row_nodes]
+
+    def get_maya_obj_names(self):
+        """
+        Get the names of all the maya objects linked to the rows
+        :return: maya object names
+        """
+        names = set(self.__maya_obj_names)
+        names.update(self.get_value("maya_obj", index) for index in range(len(self.__row_nodes))
+                     if self.__maya_objs[index] == _MAYA_OBJ_FROM_PATH)
+        return list(names)
+
+    def get_path_tree(self):
+        """
+        Getter of the tree of the paths
+        :return: path tree
+        """
+        return self.__path_tree
+
+    def get_node_path(self, node):
+        """
+        Build the path of a node
+        :param node
+        :return: path
+        """
+        return self.__path_tree.get_path(node)
+
+    def get_node(self, path):
+        """
+        Get the node of a path
+        :param path
+        :return: node (None if it doesn't exist)
+        """
+        return self.__find_node(path)
+
+    def get_node_row(self, node):
+        """
+        Getter of the row of a node
+        :param node
+        :return: row (None if the node is only a branch)
+        """
+        index = self.__node_rows[node]
+        return ResultRow(self, index) if index >= 0 else None
+
+    def get_row_node(self, index):
+        """
+        Getter of the node of a row
+        :param index
+        :return: node
+        """
+        return self.__row_nodes[index]
+
+    def get_node_maya_obj_names(self, node):
+        """
+        Get the names of the maya objects of a node and all its descendants
+        :param node
+        :return: maya object names
+        """
+        names = {}
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            index = self.__node_rows[current]
+            if index >= 0:
+                name = self.get_value("maya_obj", index)
+                if name is not None:
+                    names[name] = True
+            stack.extend(self.__path_tree.get_children(current))
+        return list(names)
+
+    def aggregate(self, values):
+        """
+        Sum the values of the rows on every node of the tree, in one vectorized pass per depth. The value of a node is
+        its own row value plus the values of its descendants
+        :param values: one value per row (NaN are ignored)
+        :return: array with one sum per node
+        """
+        parents = self.__path_tree.parents()
+        depths = self.__path_tree.depths()
+        node_rows = np.frombuffer(self.__node_rows, dtype=np.int32)
+        sums = np.zeros(len(parents), dtype=np.float64)
+        has_row = node_rows >= 0
+        sums[has_row] = np.nan_to_num(np.asarray(values, dtype=np.float64)[node_rows[has_row]])
+        attached = parents >= 0
+        for depth in range(int(depths.max()) if len(depths) > 0 else 0, 0, -1):
+            nodes = np.nonzero(attached & (depths == depth))[0]
+            sums += np.bincount(parents[nodes], weights=sums[nodes], minlength=len(sums))
+        return sums
+
+    def get_value(self, name, index):
+        """
+        Get a value of a row
+        :param name: path, maya_obj or the name of a numeric column
+        :param index
+        :return: value (None if unknown)
+        """
+        if name == "path":
+            return self.get_node_path(self.__row_nodes[index])
+        if name == "maya_obj":
+            maya_obj_index = self.__maya_objs[index]
+            if maya_obj_index == _MAYA_OBJ_FROM_PATH:
+                return ResultStore.__path_to_maya_name(self.get_node_path(self.__row_nodes[index]))
+            return self.__maya_obj_names[maya_obj_index] if maya_obj_index >= 0 else None
+        if name not in self.__columns:
+            raise KeyError(name)
+        value = self.__columns[name][index]
+        default = _COLUMNS[name][2]
+        if name != "polygons" and (value == default or value != value):
+            return None
+        return value
+
+    def column(self, name):
+        """
+        Get a copy of a numeric column. Unknown values are -1 for the integers and NaN for the floats
+        :param name: name of the column or bbox for the bounding boxes (one row of 6 values per element)
+        :return: array
+        """
+        if name == "bbox":
+            return np.frombuffer(self.__bboxes, dtype=np.float64).reshape(-1, _BBOX_SIZE).copy()
+        if name not in self.__columns:
+            raise KeyError(name)
+        return np.frombuffer(self.__columns[name], dtype=_COLUMNS[name][1]).copy()
+
+    def set_column(self, name, values):
+        """
+        Replace all the values of a numeric column
+        :param name
+        :param values: one value per row
+        :return:
+        """
+        typecode, dtype, _ = _COLUMNS[name]
+        values = np.ascontiguousarray(values, dtype=dtype)
+        if len(values) != len(self.__row_nodes):
+            raise ValueError("The column " + name + " needs " + str(len(self.__row_nodes)) + " values")
+        column = array(typecode)
+        column.frombytes(values.tobytes())
+        self.__columns[name] = column
+
+    def argsort(self, names, descending=False):
+        """
+        Get the indices of the rows sorted by several columns, the first one being the main key
+        :param names: columns
+        :param descending
+        :return: indices
+        """
+        keys = []
+        for name in reversed(names):
+            values = self.column(name)
+            if values.dtype.kind == "f":
+                values = np.nan_to_num(values, nan=-np.inf)
+            keys.append(values)
+        indices = np.lexsort(keys)
+        return indices[::-1] if descending else indices
+
+    def nlargest(self, nb, name):
+        """
+        Get the indices of the biggest rows for a column
+        :param nb
+        :param name
+        :return: indices sorted descending
+        """
+        values = self.column(name)
+        if len(values) > nb:
+            indices = np.argpartition(values, -nb)[-nb:]
+        else:
+            indices = np.arange(len(values))
+        return indices[np.argsort(values[indices])[::-1]]
+
+    def __get_maya_obj_index(self, path, maya_obj):
+        """
+        Get the index of a maya object in the table of the maya objects, adding it if needed. Nothing is added when the
+        maya object is the transform of the path
+        :param path
+        :param maya_obj: maya object or its name
+        :return: index (-1 if None)
+        """
+        if maya_obj is None: return -1
+        name = maya_obj if isinstance(maya_obj, str) else maya_obj.longName()
+        if name == ResultStore.__path_to_maya_name(path): return _MAYA_OBJ_FROM_PATH
+        index = self.__maya_obj_indices.get(name)
+        if index is None:
+            index = len(self.__maya_obj_names)
+            self.__maya_obj_names.append(name)
+            self.__maya_obj_indices[name] = index
+        return index
@@ -0,0 +1,488 @@
+import os
+import math
+import tempfile
+
+import numpy as np
+import pymel.core as pm
+
+from common.utils import *
+
+from .ArnoldSession import ArnoldSession
+from .StandinParser import StandinParser, is_ass_file, retrieve_shape_polygons, retrieve_tessellation_params, \
+    retrieve_shape_bbox, transform_bbox
+from .BudgetEngine import BudgetEngine, BYTES_PER_POLYGON
+from .ResultStore import ResultStore
+from .CameraProjection import *
+from .TessellationEstimator import estimate_micropolygons, estimate_tessellation_cost
+from .DuplicateFinder import DuplicateFinder
+from .TextureDiagnosis import TextureDiagnosis
+from arnold import *
+
+# ######################################################################################################################
+
+_PREFIX_TEMP_FILE = "renderer_diagnosis_export_"
+_NAME_TEXTURE_CACHE_FILE = "renderer_diagnosis_textures.json"
+
+
+# ######################################################################################################################
+
+class DiagnosisError(Exception):
+    """
+    Raised when the scene couldn't be diagnosed
+    """
+    pass
+
+
+def run_budget_gate(config_path, verdict_path=None, selected=False, diagnose_hidden_element=False,
+                    read_standins_files=False):
+    """
+    Diagnose the opened scene without any UI, evaluate a budget config on it and write the verdict. Made to be run
+    with mayapy as a pre-submission gate on the farm. The budget fails when the scene couldn't be diagnosed
+    :param config_path: budget config file
+    :param verdict_path: JSON file where the verdict is written (None to not write it)
+    :param selected: diagnose only selected
+    :param diagnose_hidden_element
+    :param read_standins_files
+    :return: whether the budget passed
+    """
+    budget_engine = BudgetEngine.load(config_path)
+    scene_diagnosis = SceneDiagnosis()
+    scene_diagnosis.set_diagnose_hidden_element(diagnose_hidden_element)
+    scene_diagnosis.set_read_standins_files(read_standins_files)
+    try:
+        scene_diagnosis.diagnose(selected)
+        verdict = scene_diagnosis.evaluate_budget(budget_engine)
+    except DiagnosisError as e:
+        verdict = {"passed": False, "nb_rules": len(budget_engine.get_rules()), "violations": [], "error": str(e)}
+    finally:
+        scene_diagnosis.end()
+    if verdict_path is not None:
+        BudgetEngine.write_verdict(verdict, verdict_path)
+    return verdict["passed"]
+
+
+# ######################################################################################################################
+
+class SceneDiagnosis:
+    @staticmethod
+    def __set_dcc_for_standins():
+        """
+        Set a constant to all standins to retrieve the right maya object after diagnose
+        :return:
+        """
+        standins = pm.ls(type="aiStandIn")
+        for standin in standins:
+            if not pm.objExists(standin + ".mtoa_constant_renderer_diagnosis_dcc"):
+                pm.addAttr(standin, longName="mtoa_constant_renderer_diagnosis_dcc", dataType="string")
+            pm.setAttr(standin + ".mtoa_constant_renderer_diagnosis_dcc", standin.name())
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.__arnold_session = ArnoldSession()
+        self.__result_store = ResultStore()
+        self.__standins_auto_instance = []
+        self.__hidden_objects = []
+        self.__diagnose_hidden_element = False
+        self.__read_standins_files = False
+        self.__frustum_margin = 0.0
+        self.__find_duplicates = False
+        self.__duplicate_finder = DuplicateFinder()
+        self.__duplicate_groups = []
+        self.__diagnose_textures = False
+        self.__texture_diagnosis = TextureDiagnosis(
+            (tempfile.gettempdir() + "/" + _NAME_TEXTURE_CACHE_FILE).replace("\\", "/"))
+        self.__texture_headers = {}
+        self.__textures_by_obj = {}
+
+    def get_result_store(self):
+        """
+        Getter of the result store
+        :return: result store
+        """
+        return self.__result_store
+
+    def get_duplicate_groups(self):
+        """
+        Getter of the groups of identical meshes
+        :return: duplicate groups
+        """
+        return self.__duplicate_groups
+
+    def get_texture_headers(self):
+        """
+        Getter of the headers of the textures by path
+        :return: texture headers
+        """
+        return self.__texture_headers
+
+    def get_textures_by_obj(self):
+        """
+        Getter of the texture paths by maya object name
+        :return: textures by maya object
+        """
+        return self.__textures_by_obj
+
+    def set_diagnose_hidden_element(self, diagnose_hidden_element):
+        """
+        Setter of whether the hidden elements are diagnosed
+        :param diagnose_hidden_element
+        :return:
+        """
+        self.__diagnose_hidden_element = diagnose_hidden_element
+
+    def set_read_standins_files(self, read_standins_files):
+        """
+        Setter of whether the stand-ins files are read directly instead of expanded in the export
+        :param read_standins_files
+        :return:
+        """
+        self.__read_standins_files = read_standins_files
+
+    def set_frustum_margin(self, frustum_margin):
+        """
+        Setter of the frustum margin
+        :param frustum_margin: fraction of the width and the height of the screen added on each side
+        :return:
+        """
+        self.__frustum_margin = frustum_margin
+
+    def set_find_duplicates(self, find_duplicates):
+        """
+        Setter of whether the duplicate meshes are searched
+        :param find_duplicates
+        :return:
+        """
+        self.__find_duplicates = find_duplicates
+
+    def set_diagnose_textures(self, diagnose_textures):
+        """
+        Setter of whether the textures are diagnosed
+        :param diagnose_textures
+        :return:
+        """
+        self.__diagnose_textures = diagnose_textures
+
+    def end(self):
+        """
+        Shut the Arnold session down
+        :return:
+        """
+        self.__arnold_session.end()
+
+    def diagnose(self, selected=False):
+        """
+        Export the scene and retrieve all the datas of the diagnosis in the result store. The export is written in a
+        temp file of its own so several diagnoses can run at once on a same host
+        :param selected: diagnose only selected
+        :return:
+        """
+        self.__result_store.clear()
+        self.__duplicate_groups = []
+        self.__texture_headers = {}
+        self.__textures_by_obj = {}
+        SceneDiagnosis.__set_dcc_for_standins()
+        temp_file, temp_path = tempfile.mkstemp(prefix=_PREFIX_TEMP_FILE, suffix=".ass")
+        os.close(temp_file)
+        temp_path = temp_path.replace("\\", "/")
+        try:
+            self.__export_ass(temp_path, selected)
+            self.__retrieve_polygons(temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if len(self.__result_store) == 0:
+            raise DiagnosisError("No element found in the scene")
+
+    def evaluate_budget(self, budget_engine):
+        """
+        Evaluate the budget rules over the whole result
+        :param budget_engine
+        :return: verdict
+        """
+        subdiv_polygons = self.__result_store.column("polygons").astype(np.float64)
+        subdivisions = np.maximum(self.__result_store.column("subdiv"), 0)
+        tessellation_cost = self.__result_store.column("tessellation_cost")
+        return budget_engine.evaluate(self.__result_store.get_paths(), {
+            "polygons": subdiv_polygons / np.power(4.0, subdivisions),
+            "subdiv_polygons": subdiv_polygons,
+            "dist_poly": self.__result_store.column("dist_poly"),
+            "memory": np.where(np.isnan(tessellation_cost), subdiv_polygons * BYTES_PER_POLYGON, tessellation_cost)
+        })
+
+    def __fix_auto_instancing(self):
+        """
+        Set the autoInstancing attribute to False because it doesn't works with export with expandProcedural
+        :return:
+        """
+        standins = pm.ls(type="aiStandIn")
+        self.__standins_auto_instance.clear()
+        for standin in standins:
+            if standin.useAutoInstancing.get() == 1:
+                self.__standins_auto_instance.append(standin)
+                standin.useAutoInstancing.set(0)
+
+    def __restore_auto_instancing(self):
+        """
+        Restore the autoInstancing
+        :return:
+        """
+        for standin in self.__standins_auto_instance:
+            standin.useAutoInstancing.set(1)
+        self.__standins_auto_instance.clear()
+
+    def __show_objects(self):
+        """
+        Show all the objects in the DAG
+        :return:
+        """
+        self.__hidden_objects.clear()
+        all_objects = pm.ls(dagObjects=True)
+        for obj in all_objects:
+            if not obj.visibility.get():
+                self.__hidden_objects.append(obj)
+                obj.visibility.set(1)
+
+    def __restore_hidden_objects(self):
+        """
+        Hide the objects that were hidden
+        :return:
+        """
+        for obj in self.__hidden_objects:
+            obj.visibility.set(0)
+        self.__hidden_objects.clear()
+
+    def __export_ass(self, temp_path, selected=False):
+        """
+        Export the scene in a tempfile ass to retrieve all the informations we need
+        :param temp_path
+        :param selected: export only selected
+        :return:
+        """
+        diagnose_hidden_objects = self.__diagnose_hidden_element
+        if diagnose_hidden_objects: self.__show_objects()
+        if selected:
+            pm.select(pm.ls(selection=True, dagObjects=True))
+        else:
+            pm.select(pm.ls(dagObjects=True))
+
+        # When the stand-ins files are read directly the procedurals don't need to be expanded
+        expand_procedurals = not self.__read_standins_files
+        command_1 = 'file -force -options "-mask 6399;-lightLinks 1;-shadowLinks 1;' + \
+                    ('-expandProcedurals;' if expand_procedurals else '') + '-fullPath" ' \
+                    '-type "ASS Export" -pr -es "' + temp_path + '"; '
+        command_2 = 'arnoldExportAss -f "' + temp_path + '" -s -boundingBox -mask 6399 -lightLinks 1 -shadowLinks 1 ' + \
+                    ('-expandProcedurals ' if expand_procedurals else '') + '-fullPath -cam perspShape; '
+        self.__fix_auto_instancing()
+        try:
+            pm.mel.eval(command_1)
+            pm.mel.eval(command_2)
+        except Exception as e:
+            raise DiagnosisError("Error while exporting as ASS file : " + str(e))
+        finally:
+            self.__restore_auto_instancing()
+            if diagnose_hidden_objects: self.__restore_hidden_objects()
+            pm.select([])
+
+    @staticmethod
+    def __get_world_bbox(maya_obj, bboxes):
+        """
+        Get the world bounding box of a maya object
+        :param maya_obj
+        :param bboxes: bounding boxes already computed by maya object
+        :return: bounding box (min x, min y, min z, max x, max y, max z), None if there is no object
+        """
+        if maya_obj is None: return None
+        if maya_obj not in bboxes:
+            bbox = maya_obj.getBoundingBox(space="world")
+            bboxes[maya_obj] = list(bbox.min())[:3] + list(bbox.max())[:3]
+        return bboxes[maya_obj]
+
+    @staticmethod
+    def __is_displaced(maya_obj, displaced_objs):
+        """
+        Check whether a displacement shader is assigned to the shapes of a maya object
+        :param maya_obj
+        :param displaced_objs: displacement already found by maya object
+        :return: 1 if displaced else 0
+        """
+        if maya_obj is None: return 0
+        if maya_obj not in displaced_objs:
+            shapes = maya_obj.getShapes()
+            shading_engines = set(pm.listConnections(shapes, type="shadingEngine")) if len(shapes) > 0 else set()
+            displaced_objs[maya_obj] = int(any(len(sg.displacementShader.inputs()) > 0 for sg in shading_engines))
+        return displaced_objs[maya_obj]
+
+    @staticmethod
+    def __compute_dist(camera_center, bbox):
+        """
+        Compute the distance between the camera and the center of a bounding box
+        :param camera_center
+        :param bbox
+        :return: distance (None if there is no camera or bounding box)
+        """
+        if camera_center is None or bbox is None: return None
+        return math.sqrt(sum([((bbox[i] + bbox[i + 3]) / 2 - camera_center[i]) ** 2 for i in range(3)]))
+
+    def __retrieve_polygons(self, temp_path):
+        """
+        Retrieve some datas in the ASS file exported. Retrieve the polygon count and the subdivision count for each
+        polymesh and curves
+        :param temp_path: ASS file exported
+        :return:
+        """
+        self.__duplicate_finder.clear()
+
+        camera = get_render_camera()
+        camera_center = list(camera.getTransform().getBoundingBox(space="world").center())[:3] \
+            if camera is not None else None
+        bboxes = {}
+        displaced_objs = {}
+
+        universe = self.__arnold_session.load(temp_path, AI_NODE_SHAPE)
+        if universe is None:
+            raise DiagnosisError("Error while loading the ASS file " + temp_path)
+        standins_by_file = {}
+        univ = AiUniverseGetNodeIterator(universe, AI_NODE_SHAPE)
+        while not AiNodeIteratorFinished(univ):
+            node = AiNodeIteratorGetNext(univ)
+            node_name = AiNodeGetName(node)
+            if not node_name: continue
+            renderer_diagnosis_dcc = AiNodeGetStr(node, "renderer_diagnosis_dcc")
+            is_polymesh_standin = AiNodeIs(node, "polymesh") and len(renderer_diagnosis_dcc) > 0
+            is_polymesh_mesh = AiNodeIs(node, "polymesh")
+            is_curves = AiNodeIs(node, "curves") and len(renderer_diagnosis_dcc) > 0
+            is_standin = AiNodeIs(node, "procedural") and len(renderer_diagnosis_dcc) > 0
+            if is_standin and self.__read_standins_files:
+                # The stand-ins are parsed afterward file by file
+                filename = os.path.normpath(AiNodeGetStr(node, "filename")).replace("\\", "/")
+                standins_by_file.setdefault(filename, []).append(renderer_diagnosis_dcc)
+                continue
+            if not is_polymesh_standin and not is_polymesh_mesh and not is_curves:
+                continue
+
+            nsides, subdiv_iterations = retrieve_shape_polygons(node, is_curves)
+            params = retrieve_tessellation_params(node, is_curves)
+
+            if is_polymesh_standin or is_curves:
+                parent = pm.PyNode(renderer_diagnosis_dcc).getParent() \
+                    if pm.objExists(renderer_diagnosis_dcc) else None
+                parent_name = "/" + parent.name() if parent is not None else ""
+            else:
+                parent_request = pm.ls(node_name.replace("/", "|"))
+                parent = parent_request[0].getParent() if len(parent_request) > 0 else None
+                parent_name = ""
+
+            # The shapes expanded from a stand-in are exported in world space with their own bounds
+            bbox = retrieve_shape_bbox(node, is_curves) if is_polymesh_standin \
+                else SceneDiagnosis.__get_world_bbox(parent, bboxes)
+            dist = SceneDiagnosis.__compute_dist(camera_center, bbox)
+            dist_poly = dist * nsides if dist is not None else None
+
+            if is_curves:
+                name = "/".join((parent_name + node_name).split("/"))
+            else:
+                name = "/".join((parent_name + node_name).split("/")[:-1])
+
+            # The shaders of the stand-ins files aren't loaded so the displacement of their shapes is unknown
+            if not is_polymesh_standin:
+                params["displaced"] = SceneDiagnosis.__is_displaced(parent, displaced_objs)
+            self.__result_store.set(name, nsides, subdiv_iterations, dist_poly, parent, bbox, **params)
+            # The auto instancing of the stand-ins is disabled for the export so their placements aren't duplicates
+            if self.__find_duplicates and not is_curves and not is_polymesh_standin:
+                self.__duplicate_finder.add(name, nsides, node)
+        AiNodeIteratorDestroy(univ)
+        self.__arnold_session.destroy_universe()
+        self.__duplicate_groups = self.__duplicate_finder.get_groups()
+        self.__duplicate_finder.clear()
+        self.__retrieve_standins_files_polygons(standins_by_file, camera_center)
+        self.__compute_camera_metrics(camera)
+        self.__estimate_tessellation(camera)
+        self.__retrieve_textures()
+
+    def __retrieve_standins_files_polygons(self, standins_by_file, camera_center):
+        """
+        Parse each ASS file referenced by the stand-ins once and attach its polygons to every stand-in using it
+        :param standins_by_file: dict of the file path to the stand-ins using it
+        :param camera_center
+        :return:
+        """
+        ass_paths = []
+        for path, standins in standins_by_file.items():
+            if is_ass_file(path):
+                ass_paths.append(path)
+            else:
+                print_warning("Stand-ins " + ", ".join(standins) + " can't be read directly : " + path)
+        parser = StandinParser()
+        shapes_by_file = parser.parse(ass_paths)
+        for path in parser.get_failed_paths():
+            print_warning("Error while loading the ASS file " + path)
+
+        for path, shapes in shapes_by_file.items():
+            for standin in standins_by_file[path]:
+                parent = pm.PyNode(standin).getParent() if pm.objExists(standin) else None
+                parent_name = "/" + parent.name() if parent is not None else ""
+                world_matrix = np.array(parent.worldMatrix.get(), dtype=np.float64).reshape(4, 4) \
+                    if parent is not None else None
+                for node_name, nsides, subdiv_iterations, is_curves, params, shape_bbox in shapes:
+                    # The bounds of each shape are in the space of the file so they follow the stand-in transform
+                    bbox = transform_bbox(shape_bbox, world_matrix) if world_matrix is not None else None
+                    dist = SceneDiagnosis.__compute_dist(camera_center, bbox)
+                    full_name = parent_name + "/" + node_name.lstrip("/")
+                    name = full_name if is_curves else "/".join(full_name.split("/")[:-1])
+                    self.__result_store.set(name, nsides, subdiv_iterations,
+                                            dist * nsides if dist is not None else None, parent, bbox, **params)
+
+    def __compute_camera_metrics(self, camera):
+        """
+        Project the bounding boxes of all the elements at once on the render camera to compute the polygons per pixel
+        covered and the position relative to the frustum
+        :param camera: render camera shape
+        :return:
+        """
+        if camera is None or len(self.__result_store) == 0: return
+        width, height = get_render_resolution()
+        view_projection = get_view_projection(camera, width, height)
+        clip_corners = project_bounding_boxes(self.__result_store.column("bbox"), view_projection)
+        areas = compute_screen_areas(clip_corners, width, height)
+        self.__result_store.set_column("screen_density",
+                                       compute_screen_density(self.__result_store.column("polygons"), areas))
+        self.__result_store.set_column("frustum", classify_frustum(clip_corners, self.__frustum_margin))
+
+    def __estimate_tessellation(self, camera):
+        """
+        Estimate for all the elements at once the polygons count and the memory after the adaptive subdivision and the
+        displacement
+        :param camera: render camera shape (None if there is none)
+        :return:
+        """
+        if len(self.__result_store) == 0: return
+        store = self.__result_store
+        width, height = get_render_resolution()
+        view_projection = get_view_projection(camera, width, height) if camera is not None else None
+        displaced = store.column("displaced")
+        micropolygons = estimate_micropolygons(
+            store.column("polygons"), store.column("subdiv"), store.column("subdiv_type"),
+            store.column("adaptive_error"), store.column("adaptive_metric"), store.column("adaptive_space"),
+            store.column("disp_padding"), displaced, store.column("bbox"), view_projection, width, height)
+        store.set_column("micropolygons", micropolygons)
+        store.set_column("tessellation_cost", estimate_tessellation_cost(micropolygons, displaced))
+
+    def __retrieve_textures(self):
+        """
+        Read the headers of the textures used by the maya objects of the result and attribute their memory to each
+        element
+        :return:
+        """
+        self.__texture_headers = {}
+        self.__textures_by_obj = {}
+        if not self.__diagnose_textures or len(self.__result_store) == 0: return
+        self.__texture_headers, self.__textures_by_obj = \
+            self.__texture_diagnosis.diagnose(self.__result_store.get_maya_obj_names())
+        memory_by_obj = {maya_obj_name: sum([self.__texture_headers[path]["memory"] for path in textures])
+                         for maya_obj_name, textures in self.__textures_by_obj.items() if len(textures) > 0}
+        self.__result_store.set_column("texture_memory", [
+            memory_by_obj.get(self.__result_store.get_value("maya_obj", index), np.nan)
+            for index in range(len(self.__result_store))])
+
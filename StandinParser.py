@@ -0,0 +1,307 @@
+import os
+import sys
+import ctypes
+import multiprocessing
+from multiprocessing.util import Finalize
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from .ArnoldSession import ArnoldSession
+from arnold import *
+
+# ######################################################################################################################
+
+# This module is imported by the worker processes so it must not import Maya
+
+# Enums of the polymesh parameters
+SUBDIV_TYPE_NONE = 0
+SUBDIV_TYPE_CATCLARK = 1
+SUBDIV_TYPE_LINEAR = 2
+SUBDIV_TYPE_NAMES = {SUBDIV_TYPE_NONE: "none", SUBDIV_TYPE_CATCLARK: "catclark", SUBDIV_TYPE_LINEAR: "linear"}
+ADAPTIVE_METRIC_AUTO = 0
+ADAPTIVE_METRIC_EDGE_LENGTH = 1
+ADAPTIVE_METRIC_FLATNESS = 2
+ADAPTIVE_SPACE_RASTER = 0
+ADAPTIVE_SPACE_OBJECT = 1
+
+_ASS_EXTENSIONS = (".ass", ".ass.gz")
+
+# Arnold session of a worker process, started once by the initializer of the pool
+_worker_session = None
+
+
+# ######################################################################################################################
+
+def is_ass_file(path):
+    """
+    Check whether a path is an ASS file that can be parsed directly
+    :param path
+    :return: is ASS file
+    """
+    return path.lower().endswith(_ASS_EXTENSIONS)
+
+
+def retrieve_shape_polygons(node, is_curves):
+    """
+    Compute the polygon count of a polymesh or curves node, taking the subdivision iterations into account
+    :param node
+    :param is_curves
+    :return: polygon count, subdivision iterations (None if not subdivided)
+    """
+    if is_curves:
+        nsides = round(AiArrayGetNumElements(AiNodeGetArray(node, "num_points").contents) / 3.5)
+    else:
+        nsides = AiArrayGetNumElements(AiNodeGetArray(node, "nsides").contents)
+    subdiv_iterations = AiNodeGetInt(node, "subdiv_iterations")
+    if subdiv_iterations > 0:
+        nsides = nsides * pow(4, subdiv_iterations)
+    else:
+        subdiv_iterations = None
+    return nsides, subdiv_iterations
+
+
+def retrieve_tessellation_params(node, is_curves):
+    """
+    Retrieve the parameters of a shape driving its tessellation
+    :param node
+    :param is_curves
+    :return: dict of the values of the tessellation columns
+    """
+    if is_curves:
+        return {"subdiv_type": SUBDIV_TYPE_NONE}
+    return {
+        "subdiv_type": AiNodeGetInt(node, "subdiv_type"),
+        "adaptive_error": AiNodeGetFlt(node, "subdiv_adaptive_error"),
+        "adaptive_metric": AiNodeGetInt(node, "subdiv_adaptive_metric"),
+        "adaptive_space": AiNodeGetInt(node, "subdiv_adaptive_space"),
+        "disp_padding": AiNodeGetFlt(node, "disp_padding"),
+    }
+
+
+def get_node_matrix(node):
+    """
+    Get the matrix of a node at its first motion key
+    :param node
+    :return: 4x4 matrix in row vector convention
+    """
+    matrix = AiNodeGetMatrix(node, "matrix")
+    return np.array([[matrix.data[row][column] for column in range(4)] for row in range(4)], dtype=np.float64)
+
+
+def transform_bbox(bbox, matrix):
+    """
+    Transform a bounding box by a matrix, keeping it aligned on the axes
+    :param bbox: (min x, min y, min z, max x, max y, max z), None if unknown
+    :param matrix: 4x4 matrix in row vector convention
+    :return: bounding box (None if unknown)
+    """
+    if bbox is None: return None
+    corners = np.array([[bbox[x], bbox[y], bbox[z], 1] for x in (0, 3) for y in (1, 4) for z in (2, 5)])
+    corners = (corners @ np.asarray(matrix, dtype=np.float64))[:, :3]
+    return corners.min(axis=0).tolist() + corners.max(axis=0).tolist()
+
+
+def retrieve_shape_bbox(node, is_curves):
+    """
+    Compute the bounding box of a shape from its points at the first motion key, transformed by its matrix
+    :param node
+    :param is_curves
+    :return: bounding box in the space of the parent of the node (None if the shape has no point)
+    """
+    array = AiNodeGetArray(node, "points" if is_curves else "vlist")
+    if not array or AiArrayGetType(array) != AI_TYPE_VECTOR: return None
+    nb_points = AiArrayGetNumElements(array)
+    if nb_points == 0: return None
+    address = AiArrayMap(array)
+    points = np.frombuffer((ctypes.c_float * (nb_points * 3)).from_address(address), dtype=np.float32).reshape(-1, 3)
+    bbox = points.min(axis=0).tolist() + points.max(axis=0).tolist()
+    del points
+    AiArrayUnmap(array)
+    return transform_bbox(bbox, get_node_matrix(node))
+
+
+def init_worker():
+    """
+    Start Arnold once in a worker process. It is shut down when the process exits
+    :return:
+    """
+    global _worker_session
+    _worker_session = ArnoldSession()
+    _worker_session.begin()
+    Finalize(_worker_session, _worker_session.end, exitpriority=10)
+
+
+def parse_ass_file(ass_path):
+    """
+    Retrieve the shapes and the nested procedurals of an ASS file. Run in a worker process, only the universe is
+    created and destroyed for each file
+    :param ass_path
+    :return: ass path, datas (None if the file couldn't be loaded)
+    """
+    if _worker_session is None:
+        init_worker()
+    universe = _worker_session.load(ass_path, AI_NODE_SHAPE)
+    if universe is None:
+        return ass_path, None
+    shapes = []
+    procedurals = []
+    dir_path = os.path.dirname(ass_path)
+    univ = AiUniverseGetNodeIterator(universe, AI_NODE_SHAPE)
+    while not AiNodeIteratorFinished(univ):
+        node = AiNodeIteratorGetNext(univ)
+        node_name = AiNodeGetName(node)
+        if not node_name: continue
+        is_curves = AiNodeIs(node, "curves")
+        if AiNodeIs(node, "polymesh") or is_curves:
+            polygons, subdiv_iterations = retrieve_shape_polygons(node, is_curves)
+            shapes.append((node_name, polygons, subdiv_iterations, is_curves,
+                           retrieve_tessellation_params(node, is_curves), retrieve_shape_bbox(node, is_curves)))
+        elif AiNodeIs(node, "procedural"):
+            filename = AiNodeGetStr(node, "filename")
+            if not is_ass_file(filename): continue
+            if not os.path.isabs(filename):
+                filename = os.path.join(dir_path, filename)
+            procedurals.append((node_name, os.path.normpath(filename).replace("\\", "/"),
+                                get_node_matrix(node).tolist()))
+    AiNodeIteratorDestroy(univ)
+    _worker_session.destroy_universe()
+    return ass_path, {"shapes": shapes, "procedurals": procedurals}
+
+
+# ######################################################################################################################
+
+class StandinParser:
+    @staticmethod
+    def __get_mp_context():
+        """
+        Get the multiprocessing context. Inside Maya the workers have to be run with mayapy and not the Maya executable
+        :return: multiprocessing context (None if mayapy can't be found)
+        """
+        mp_context = multiprocessing.get_context("spawn")
+        executable_dir, executable_name = os.path.split(sys.executable)
+        if executable_name.lower().startswith("maya."):
+            mayapy = os.path.join(executable_dir, "mayapy.exe" if sys.platform == "win32" else "mayapy")
+            if not os.path.exists(mayapy): return None
+            mp_context.set_executable(mayapy)
+        return mp_context
+
+    def __init__(self, max_workers=None):
+        """
+        Constructor
+        :param max_workers: max number of processes (None for the number of cores), never more than the files to parse
+        """
+        self.__max_workers = max_workers
+        self.__files_datas = {}
+
+    def get_failed_paths(self):
+        """
+        Getter of the files that couldn't be loaded
+        :return: failed paths
+        """
+        return [path for path, datas in self.__files_datas.items() if datas is None]
+
+    def parse(self, ass_paths):
+        """
+        Parse each unique ASS file once in parallel, following the nested procedurals recursively
+        :param ass_paths
+        :return: dict of ass path to the list of shapes (name, polygons, subdivisions, is_curves, tessellation params,
+        bounding box in the space of the file) it expands to
+        """
+        self.__files_datas.clear()
+        seen_paths = set(ass_paths)
+        if len(seen_paths) == 0: return {}
+        mp_context = StandinParser.__get_mp_context()
+        if mp_context is None:
+            # Without mayapy the workers would start whole Maya instances so the files are parsed in this process
+            self.__parse_in_process(seen_paths)
+        else:
+            self.__parse_in_pool(seen_paths, mp_context)
+
+        flattened = {}
+        for ass_path in ass_paths:
+            self.__flatten(ass_path, flattened, set())
+        return {ass_path: flattened.get(ass_path, []) for ass_path in ass_paths}
+
+    def __add_datas(self, ass_path, datas, seen_paths):
+        """
+        Keep the datas of a file parsed and find the nested files not parsed yet
+        :param ass_path
+        :param datas: None if the file couldn't be parsed
+        :param seen_paths: files already parsed or being parsed
+        :return: nested paths to parse
+        """
+        self.__files_datas[ass_path] = datas
+        if datas is None: return []
+        nested_paths = []
+        for _, nested_path, _ in datas["procedurals"]:
+            if nested_path in seen_paths: continue
+            seen_paths.add(nested_path)
+            nested_paths.append(nested_path)
+        return nested_paths
+
+    def __parse_in_process(self, seen_paths):
+        """
+        Parse the files one after the other in the current process
+        :param seen_paths: files to parse, the nested files are added
+        :return:
+        """
+        to_parse = list(seen_paths)
+        while to_parse:
+            ass_path = to_parse.pop()
+            try:
+                ass_path, datas = parse_ass_file(ass_path)
+            except Exception:
+                datas = None
+            to_parse.extend(self.__add_datas(ass_path, datas, seen_paths))
+
+    def __parse_in_pool(self, seen_paths, mp_context):
+        """
+        Parse the files in worker processes. A file making its worker fail or crash is kept as failed
+        :param seen_paths: files to parse, the nested files are added
+        :param mp_context
+        :return:
+        """
+        max_workers = min(self.__max_workers or os.cpu_count() or 1, len(seen_paths))
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                                 initializer=init_worker) as executor:
+            pending = {executor.submit(parse_ass_file, path): path for path in seen_paths}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ass_path = pending.pop(future)
+                    try:
+                        ass_path, datas = future.result()
+                    except Exception:
+                        # Raised by the worker or BrokenProcessPool when the worker crashed on a corrupt file
+                        datas = None
+                    for nested_path in self.__add_datas(ass_path, datas, seen_paths):
+                        try:
+                            pending[executor.submit(parse_ass_file, nested_path)] = nested_path
+                        except BrokenProcessPool:
+                            self.__files_datas[nested_path] = None
+
+    def __flatten(self, ass_path, flattened, visiting):
+        """
+        Compute the shapes of a file with the shapes of its nested procedurals prefixed by the procedural name and
+        transformed by its matrix
+        :param ass_path
+        :param flattened: results already computed
+        :param visiting: files being computed to avoid cycles
+        :return: shapes
+        """
+        if ass_path in flattened: return flattened[ass_path]
+        datas = self.__files_datas.get(ass_path)
+        if datas is None or ass_path in visiting: return []
+        visiting.add(ass_path)
+        shapes = list(datas["shapes"])
+        for procedural_name, nested_path, matrix in datas["procedurals"]:
+            for name, polygons, subdiv_iterations, is_curves, params, bbox in \
+                    self.__flatten(nested_path, flattened, visiting):
+                nested_name = procedural_name.rstrip("/") + "/" + name.lstrip("/")
+                shapes.append((nested_name, polygons, subdiv_iterations, is_curves, params,
+                               transform_bbox(bbox, matrix)))
+        visiting.remove(ass_path)
+        flattened[ass_path] = shapes
+        return shapes
@@ -0,0 +1,74 @@
+import numpy as np
+
+from .CameraProjection import project_bounding_boxes, compute_projected_areas
+from .StandinParser import SUBDIV_TYPE_NONE, ADAPTIVE_METRIC_AUTO, ADAPTIVE_METRIC_FLATNESS, ADAPTIVE_SPACE_OBJECT
+from .BudgetEngine import BYTES_PER_POLYGON
+
+# ######################################################################################################################
+
+# Both faces of a surface are tessellated while its screen bounding box only shows one
+_SURFACE_PER_SCREEN_AREA = 2
+# Displaced positions, normals and bounds stored in addition to the tessellated mesh
+_DISPLACEMENT_COST_FACTOR = 1.5
+
+
+# ######################################################################################################################
+
+def estimate_micropolygons(polygons, subdivisions, subdiv_types, adaptive_errors, adaptive_metrics, adaptive_spaces,
+                           disp_paddings, displaced, bboxes, view_projection=None, width=0, height=0):
+    """
+    Estimate for all the shapes at once the polygons count after tessellation.
+    Adaptive subdivision with an edge length metric stops when the edges are shorter than the adaptive error, so the
+    count is the surface of the shape (in pixels in raster space or in world units in object space) divided by the
+    square of the error, bounded by the base polygons count and the count at max iterations. Arnold doesn't cull the
+    subdivision outside of the frustum so the raster surface is the projected size of the shape even out of the screen
+    or behind the camera. The flatness metric depends on the curvature and can't be predicted so the max is used, like
+    for the auto metric of the shapes that aren't displaced (Arnold uses the flatness for them and the edge length
+    only for the displaced shapes) and for the shapes whose displacement is unknown (the shaders of the stand-ins files
+    aren't loaded)
+    :param polygons: polygons count with the subdivision iterations
+    :param subdivisions: subdivision iterations (-1 if not subdivided)
+    :param subdiv_types
+    :param adaptive_errors
+    :param adaptive_metrics
+    :param adaptive_spaces
+    :param disp_paddings: padding of the bounds for the displaced shapes
+    :param displaced: 1 for the displaced shapes, -1 if unknown
+    :param bboxes: array (N, 6) of world bounding boxes
+    :param view_projection: view projection matrix of the render camera (None if there is no camera)
+    :param width: render width
+    :param height: render height
+    :return: estimated micropolygons
+    """
+    max_polygons = polygons.astype(np.float64)
+    base_polygons = max_polygons / np.power(4.0, np.maximum(subdivisions, 0))
+    subdivided = (subdiv_types != SUBDIV_TYPE_NONE) & (subdivisions > 0)
+    adaptive_metrics = np.where((adaptive_metrics == ADAPTIVE_METRIC_AUTO) & (displaced != 1), ADAPTIVE_METRIC_FLATNESS,
+                                adaptive_metrics)
+    adaptive = subdivided & (adaptive_errors > 0) & (adaptive_metrics != ADAPTIVE_METRIC_FLATNESS) & (displaced != -1)
+
+    padding = np.where(displaced == 1, np.nan_to_num(disp_paddings), 0)[:, None]
+    padded_bboxes = bboxes + np.concatenate([-padding.repeat(3, axis=1), padding.repeat(3, axis=1)], axis=1)
+    sizes = padded_bboxes[:, 3:] - padded_bboxes[:, :3]
+    object_surfaces = 2 * (sizes[:, 0] * sizes[:, 1] + sizes[:, 1] * sizes[:, 2] + sizes[:, 0] * sizes[:, 2])
+    if view_projection is not None:
+        raster_surfaces = _SURFACE_PER_SCREEN_AREA * compute_projected_areas(
+            project_bounding_boxes(padded_bboxes, view_projection), width, height)
+    else:
+        raster_surfaces = np.full(len(polygons), np.nan)
+    surfaces = np.where(adaptive_spaces == ADAPTIVE_SPACE_OBJECT, object_surfaces, raster_surfaces)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        adaptive_polygons = np.clip(surfaces / np.square(adaptive_errors), base_polygons, max_polygons)
+    adaptive_polygons = np.where(np.isnan(adaptive_polygons), max_polygons, adaptive_polygons)
+    return np.where(adaptive, adaptive_polygons, np.where(subdivided, max_polygons, base_polygons))
+
+
+def estimate_tessellation_cost(micropolygons, displaced):
+    """
+    Estimate the memory used by the tessellated shapes
+    :param micropolygons
+    :param displaced: 1 for the displaced shapes
+    :return: cost in bytes
+    """
+    return micropolygons * BYTES_PER_POLYGON * np.where(displaced == 1, _DISPLACEMENT_COST_FACTOR, 1)
@@ -0,0 +1,178 @@
+import os
+import json
+import ctypes
+from concurrent.futures import ThreadPoolExecutor
+
+import pymel.core as pm
+
+from .TextureHeader import expand_texture_path, estimate_texture_memory, read_texture_header
+from arnold import *
+
+# ######################################################################################################################
+
+_DEFAULT_MAX_WORKERS = 16
+
+
+# ######################################################################################################################
+
+def _read_arnold_header(path):
+    """
+    Read the header of a texture of another format with the texture system of Arnold
+    :param path
+    :return: header (None if it can't be read)
+    """
+    width = ctypes.c_uint()
+    height = ctypes.c_uint()
+    channels = ctypes.c_uint()
+    bit_depth = ctypes.c_uint()
+    if not AiTextureGetResolution(path, ctypes.byref(width), ctypes.byref(height)): return None
+    AiTextureGetNumChannels(path, ctypes.byref(channels))
+    AiTextureGetBitDepth(path, ctypes.byref(bit_depth))
+    return {
+        "format": os.path.splitext(path)[1][1:].lower(),
+        "width": width.value,
+        "height": height.value,
+        "channels": channels.value,
+        "bit_depth": bit_depth.value,
+        "tiled": False,
+        "mip_levels": 1
+    }
+
+
+# ######################################################################################################################
+
+class TextureDiagnosis:
+    @staticmethod
+    def __uses_tx_files():
+        """
+        Check whether MtoA renders the TX files next to the textures, with the existing tiled textures or the auto TX
+        options of the render settings
+        :return: uses TX files
+        """
+        if not pm.objExists("defaultArnoldRenderOptions"): return False
+        options = pm.PyNode("defaultArnoldRenderOptions")
+        return any(options.hasAttr(attr) and options.attr(attr).get()
+                   for attr in ["use_existing_tiled_textures", "autotx"])
+
+    @staticmethod
+    def __get_texture_paths(shading_engine):
+        """
+        Get the texture paths used by the shaders of a shading engine. Only the networks upstream of the shaders are
+        walked, not the history of the members
+        :param shading_engine
+        :return: texture paths (with their tile tokens) as (TX path, source path)
+        """
+        paths = set()
+        shaders = shading_engine.surfaceShader.inputs() + shading_engine.displacementShader.inputs() + \
+            shading_engine.volumeShader.inputs()
+        if len(shaders) == 0: return paths
+        for texture_node in pm.listHistory(shaders, type=["file", "aiImage"]):
+            if texture_node.type() == "file":
+                path = texture_node.computedFileTextureNamePattern.get() \
+                    if texture_node.hasAttr("computedFileTextureNamePattern") else ""
+                path = path or texture_node.fileTextureName.get()
+            else:
+                path = texture_node.filename.get()
+            if not path: continue
+            # MtoA renders the TX files next to the texture if there are some
+            path = path.replace("\\", "/")
+            paths.add((os.path.splitext(path)[0] + ".tx", path))
+        return paths
+
+    def __init__(self, cache_path, max_workers=_DEFAULT_MAX_WORKERS):
+        """
+        Constructor
+        :param cache_path: JSON file keeping the headers read by path, mtime and size
+        :param max_workers: number of threads reading the files
+        """
+        self.__cache_path = cache_path
+        self.__max_workers = max_workers
+        self.__cache = None
+
+    def __load_cache(self):
+        """
+        Load the cache of the headers
+        :return:
+        """
+        if self.__cache is not None: return
+        self.__cache = {}
+        if not os.path.isfile(self.__cache_path): return
+        try:
+            with open(self.__cache_path, "r") as cache_file:
+                self.__cache = json.load(cache_file)
+        except (OSError, ValueError):
+            self.__cache = {}
+
+    def __save_cache(self):
+        """
+        Save the cache of the headers
+        :return:
+        """
+        try:
+            with open(self.__cache_path, "w") as cache_file:
+                json.dump(self.__cache, cache_file)
+        except OSError:
+            pass
+
+    def __read_header(self, path):
+        """
+        Read the header of a texture or get it from the cache if the file didn't change. Run in a thread
+        :param path
+        :return: path, cache entry (None if it can't be read)
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return path, None
+        entry = self.__cache.get(path)
+        if entry is not None and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            return path, entry
+        header = read_texture_header(path, _read_arnold_header)
+        if header is None: return path, None
+        header["memory"] = estimate_texture_memory(header)
+        return path, {"mtime": stat.st_mtime, "size": stat.st_size, "header": header}
+
+    def diagnose(self, maya_obj_names):
+        """
+        Find the textures used by the maya objects and read their headers concurrently
+        :param maya_obj_names
+        :return: dict of the texture path to its header, dict of the maya object name to its texture paths
+        """
+        self.__load_cache()
+        uses_tx_files = TextureDiagnosis.__uses_tx_files()
+        # The scene is only read in the main thread
+        patterns_by_obj = {}
+        patterns_by_shading_engine = {}
+        for maya_obj_name in maya_obj_names:
+            if not pm.objExists(maya_obj_name): continue
+            shapes = pm.PyNode(maya_obj_name).getShapes()
+            if len(shapes) == 0: continue
+            patterns = set()
+            for shading_engine in set(pm.listConnections(shapes, type="shadingEngine")):
+                if shading_engine not in patterns_by_shading_engine:
+                    patterns_by_shading_engine[shading_engine] = TextureDiagnosis.__get_texture_paths(shading_engine)
+                patterns.update(patterns_by_shading_engine[shading_engine] if uses_tx_files else
+                                [(pattern, pattern) for _, pattern in patterns_by_shading_engine[shading_engine]])
+            patterns_by_obj[maya_obj_name] = patterns
+
+        all_patterns = set([pattern for patterns in patterns_by_obj.values() for pair in patterns for pattern in pair])
+        with ThreadPoolExecutor(max_workers=self.__max_workers) as executor:
+            files_by_pattern = dict(zip(all_patterns, executor.map(expand_texture_path, all_patterns)))
+            # The source files are used only when no TX file is found
+            paths_by_pattern = {(tx_pattern, pattern): files_by_pattern[tx_pattern] or files_by_pattern[pattern]
+                                for patterns in patterns_by_obj.values() for tx_pattern, pattern in patterns}
+            all_paths = set().union(*paths_by_pattern.values()) if len(paths_by_pattern) > 0 else set()
+            entries = dict(executor.map(self.__read_header, all_paths))
+
+        headers = {}
+        for path, entry in entries.items():
+            if entry is None: continue
+            self.__cache[path] = entry
+            headers[path] = entry["header"]
+        self.__save_cache()
+
+        textures_by_obj = {}
+        for maya_obj_name, patterns in patterns_by_obj.items():
+            textures_by_obj[maya_obj_name] = frozenset(
+                path for pattern in patterns for path in paths_by_pattern[pattern] if path in headers)
+        return headers, textures_by_obj
@@ -0,0 +1,178 @@
+import os
+import re
+import glob
+import math
+import struct
+
+# ######################################################################################################################
+
+# This module doesn't import Maya nor Arnold so the headers can be read anywhere
+
+# Size of the beginning of an EXR file read to find its header
+_EXR_HEADER_READ_SIZE = 65536
+_EXR_MAGIC = 20000630
+_EXR_TILED_FLAG = 0x200
+_EXR_BITS_BY_PIXEL_TYPE = {0: 32, 1: 16, 2: 32}
+# Max number of mip levels read in a TIFF
+_TIFF_MAX_LEVELS = 32
+_TIFF_TYPE_SIZES = {1: 1, 3: 2, 4: 4}
+# Tokens of the tiled textures and the regex they match
+_TILE_TOKENS = {
+    "<udim>": r"\d{4}",
+    "<tile>": r"_u\d+_v\d+",
+    "<u>": r"\d+",
+    "<v>": r"\d+",
+}
+_TILE_TOKENS_REGEX = re.compile("|".join(re.escape(token) for token in _TILE_TOKENS), re.IGNORECASE)
+
+
+# ######################################################################################################################
+
+def expand_texture_path(path):
+    """
+    Find on disk the files of a texture path containing <udim>, <tile>, <u> or <v> tokens
+    :param path
+    :return: paths of the files
+    """
+    if not _TILE_TOKENS_REGEX.search(path):
+        return [path] if os.path.isfile(path) else []
+    glob_pattern = _TILE_TOKENS_REGEX.sub("*", path)
+    regex_pattern = ""
+    last_end = 0
+    for match in _TILE_TOKENS_REGEX.finditer(path):
+        regex_pattern += re.escape(path[last_end:match.start()]) + _TILE_TOKENS[match.group(0).lower()]
+        last_end = match.end()
+    regex = re.compile(regex_pattern + re.escape(path[last_end:]) + "$")
+    return sorted([file_path.replace("\\", "/") for file_path in glob.glob(glob_pattern)
+                   if regex.match(file_path.replace("\\", "/"))])
+
+
+def estimate_texture_memory(header):
+    """
+    Estimate the memory of a texture fully loaded. The mip levels add a third of the full resolution
+    :param header
+    :return: memory in bytes
+    """
+    memory = header["width"] * header["height"] * header["channels"] * header["bit_depth"] / 8
+    return memory * 4 / 3 if header["mip_levels"] > 1 else memory
+
+
+def read_tiff_header(texture_file, byte_order):
+    """
+    Read the header of a TIFF (and TX) file. Each mip level is stored in its own IFD
+    :param texture_file
+    :param byte_order: < or >
+    :return: header
+    """
+
+    def __read_value(entry):
+        """
+        Read the first value of an IFD entry
+        :param entry: 12 bytes of the entry
+        :return: tag, value
+        """
+        tag, value_type, count = struct.unpack(byte_order + "HHI", entry[:8])
+        value_size = _TIFF_TYPE_SIZES.get(value_type, 4)
+        if count * value_size <= 4:
+            data = entry[8:8 + value_size]
+        else:
+            offset = struct.unpack(byte_order + "I", entry[8:12])[0]
+            position = texture_file.tell()
+            texture_file.seek(offset)
+            data = texture_file.read(value_size)
+            texture_file.seek(position)
+        value = struct.unpack(byte_order + {1: "B", 3: "H"}.get(value_type, "I"), data)[0]
+        return tag, value
+
+    texture_file.seek(4)
+    ifd_offset = struct.unpack(byte_order + "I", texture_file.read(4))[0]
+    header = None
+    mip_levels = 0
+    while ifd_offset != 0 and mip_levels < _TIFF_MAX_LEVELS:
+        texture_file.seek(ifd_offset)
+        nb_entries = struct.unpack(byte_order + "H", texture_file.read(2))[0]
+        entries = texture_file.read(nb_entries * 12)
+        if header is None:
+            tags = dict(__read_value(entries[i * 12:(i + 1) * 12]) for i in range(nb_entries))
+            header = {
+                "format": "tiff",
+                "width": tags.get(256, 0),
+                "height": tags.get(257, 0),
+                "channels": tags.get(277, 1),
+                "bit_depth": tags.get(258, 8),
+                "tiled": 322 in tags,
+            }
+        mip_levels += 1
+        ifd_offset = struct.unpack(byte_order + "I", texture_file.read(4))[0]
+    if header is None: return None
+    header["mip_levels"] = mip_levels
+    return header
+
+
+def read_exr_header(texture_file):
+    """
+    Read the header of an EXR file
+    :param texture_file
+    :return: header
+    """
+    data = texture_file.read(_EXR_HEADER_READ_SIZE)
+    version = struct.unpack("<I", data[4:8])[0]
+    position = 8
+    attributes = {}
+    while position < len(data) and data[position] != 0:
+        name_end = data.index(b"\0", position)
+        type_end = data.index(b"\0", name_end + 1)
+        name = data[position:name_end].decode()
+        size = struct.unpack("<i", data[type_end + 1:type_end + 5])[0]
+        attributes[name] = data[type_end + 5:type_end + 5 + size]
+        position = type_end + 5 + size
+
+    channels = 0
+    bit_depth = 0
+    channels_data = attributes.get("channels", b"")
+    channel_position = 0
+    while channel_position < len(channels_data) and channels_data[channel_position] != 0:
+        name_end = channels_data.index(b"\0", channel_position)
+        pixel_type = struct.unpack("<i", channels_data[name_end + 1:name_end + 5])[0]
+        bit_depth = max(bit_depth, _EXR_BITS_BY_PIXEL_TYPE.get(pixel_type, 32))
+        channels += 1
+        channel_position = name_end + 17
+    x_min, y_min, x_max, y_max = struct.unpack("<iiii", attributes.get("dataWindow", b"\0" * 16))
+    width = x_max - x_min + 1
+    height = y_max - y_min + 1
+
+    tiled = bool(version & _EXR_TILED_FLAG) or "tiles" in attributes
+    mip_levels = 1
+    if "tiles" in attributes and len(attributes["tiles"]) >= 9:
+        level_mode = attributes["tiles"][8] & 0x0F
+        if level_mode != 0:
+            mip_levels = int(math.floor(math.log2(max(width, height, 1)))) + 1
+    return {
+        "format": "exr",
+        "width": width,
+        "height": height,
+        "channels": channels,
+        "bit_depth": bit_depth,
+        "tiled": tiled,
+        "mip_levels": mip_levels
+    }
+
+
+def read_texture_header(path, read_other_format=None):
+    """
+    Read only the header of a texture : resolution, channels, bit depth, tiling and mip levels
+    :param path
+    :param read_other_format: function reading the header of the formats other than TIFF and EXR (None if unsupported)
+    :return: header (None if it can't be read)
+    """
+    try:
+        with open(path, "rb") as texture_file:
+            magic = texture_file.read(4)
+            if magic in (b"II*\0", b"MM\0*"):
+                return read_tiff_header(texture_file, "<" if magic[:2] == b"II" else ">")
+            if len(magic) == 4 and struct.unpack("<I", magic)[0] == _EXR_MAGIC:
+                texture_file.seek(0)
+                return read_exr_header(texture_file)
+    except (OSError, struct.error, ValueError, UnicodeDecodeError):
+        return None
+    return read_other_format(path) if read_other_format is not None else None
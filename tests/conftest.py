@@ -0,0 +1,17 @@
+import os
+import sys
+import importlib.util
+
+# ######################################################################################################################
+
+# The repository is the renderer_diagnosis package itself, it is registered under its name so the modules and their
+# relative imports can be tested outside of Maya
+_PACKAGE_NAME = "renderer_diagnosis"
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if _PACKAGE_NAME not in sys.modules:
+    _spec = importlib.util.spec_from_file_location(_PACKAGE_NAME, os.path.join(_PACKAGE_DIR, "__init__.py"),
+                                                   submodule_search_locations=[_PACKAGE_DIR])
+    _package = importlib.util.module_from_spec(_spec)
+    sys.modules[_PACKAGE_NAME] = _package
+    _spec.loader.exec_module(_package)
@@ -0,0 +1,62 @@
+import numpy as np
+
+from renderer_diagnosis.BudgetEngine import BudgetEngine, BudgetRule, glob_to_regex
+
+
+# ######################################################################################################################
+
+def _evaluate(rule, paths, polygons):
+    """
+    Evaluate a single rule on leaves
+    :param rule
+    :param paths
+    :param polygons
+    :return: verdict
+    """
+    values = np.array(polygons, dtype=np.float64)
+    return BudgetEngine([rule]).evaluate(paths, {
+        "polygons": values, "subdiv_polygons": values, "dist_poly": values, "memory": values})
+
+
+def test_whole_level_star_does_not_match_root():
+    rule = BudgetRule("all", "/*", "polygons", 10, "branch")
+    assert not rule.match("/")
+    assert rule.match("/set")
+    assert not rule.match("/set/props")
+
+
+def test_star_stays_in_one_level():
+    rule = BudgetRule("props", "/*/props/*", "polygons", 10)
+    assert rule.match("/set/props/chair")
+    assert not rule.match("/set/props/chair/geo")
+    assert not rule.match("/set/sub/props/chair")
+
+
+def test_double_star_matches_branch_itself():
+    rule = BudgetRule("chars", "/chars/**", "polygons", 10, "branch")
+    assert rule.match("/chars")
+    assert rule.match("/chars/hero/body")
+    assert not rule.match("/characters")
+
+
+def test_negated_class():
+    rule = BudgetRule("not_a", "/set/[!a]*", "polygons", 10)
+    assert rule.match("/set/bench")
+    assert not rule.match("/set/arch")
+    # A negated class never matches the separator
+    assert glob_to_regex("/set[!x]a").startswith("(?s:/set[^/")
+    assert not BudgetRule("sep", "/set[!x]a", "polygons", 10).match("/set/a")
+
+
+def test_branch_sums_and_root():
+    verdict = _evaluate(BudgetRule("scene", "/", "polygons", 25, "branch"),
+                         ["/set/a/geo", "/set/b/geo", "/chars/hero"], [10, 10, 10])
+    assert not verdict["passed"]
+    assert [violation["path"] for violation in verdict["violations"]] == ["/"]
+    assert verdict["violations"][0]["value"] == 30
+
+
+def test_empty_result_passes_without_violation():
+    verdict = _evaluate(BudgetRule("props", "/*/props/*", "polygons", 10), [], [])
+    assert verdict["passed"]
+    assert verdict["violations"] == []
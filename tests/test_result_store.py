@@ -0,0 +1,84 @@
+import numpy as np
+
+from renderer_diagnosis.ResultStore import ResultStore, ROOT_NODE
+
+
+# ######################################################################################################################
+
+def _build_store():
+    """
+    Create a store of 3 meshes, one being a shape of a stand-in
+    :return: store
+    """
+    store = ResultStore()
+    store.set("/set/a/geo", 10, None, None, "|set|a|geo")
+    store.set("/set/b/geo", 20, 1, 5.0, "|set|b|geo", frustum=2)
+    store.set("/set/standin/rock", 40, None, None, "|set|standin")
+    return store
+
+
+def test_set_and_get():
+    store = _build_store()
+    assert len(store) == 3
+    row = store.get("/set/b/geo")
+    assert row.get_polygons() == 20
+    assert row.get_subdivisions() == 1
+    assert row.get_frustum() == 2
+    assert store.get("/set/a/geo").get_subdivisions() is None
+    # The maya name of a native mesh is derived from its path, the one of a stand-in shape is kept
+    assert store.get("/set/a/geo").get_maya_obj_name() == "|set|a|geo"
+    assert store.get("/set/standin/rock").get_maya_obj_name() == "|set|standin"
+    assert store.get("/set/c") is None
+
+
+def test_update_keeps_other_columns():
+    store = _build_store()
+    store.update("/set/b/geo", polygons=80, subdiv=None)
+    row = store.get("/set/b/geo")
+    assert row.get_polygons() == 80
+    assert row.get_subdivisions() is None
+    assert row.get_frustum() == 2
+    assert row.get_dist_poly() == 5.0
+
+
+def test_remove_moves_last_row():
+    store = _build_store()
+    store.remove("/set/a/geo")
+    assert len(store) == 2
+    assert "/set/a/geo" not in store
+    assert sorted(store.get_paths()) == ["/set/b/geo", "/set/standin/rock"]
+    assert store.get("/set/standin/rock").get_polygons() == 40
+    assert store.get("/set/standin/rock").get_maya_obj_name() == "|set|standin"
+    # Removing a path twice or an unknown path does nothing
+    store.remove("/set/a/geo")
+    store.remove("/unknown")
+    assert len(store) == 2
+
+
+def test_aggregate_after_remove():
+    store = _build_store()
+    store.remove("/set/a/geo")
+    sums = store.aggregate(store.column("polygons"))
+    assert sums[ROOT_NODE] == 60
+    assert sums[store.get_node("/set")] == 60
+    assert sums[store.get_node("/set/b")] == 20
+    # The branch left empty is detached from the tree
+    assert store.get_node("/set/a") is None
+    path_tree = store.get_path_tree()
+    children = [path_tree.get_name(node) for node in path_tree.get_children(store.get_node("/set"))]
+    assert sorted(children) == ["b", "standin"]
+
+
+def test_aggregate_ignores_unknown_values():
+    store = _build_store()
+    sums = store.aggregate(store.column("dist_poly"))
+    assert sums[ROOT_NODE] == 5.0
+    assert np.isnan(store.column("dist_poly")[0])
+
+
+def test_set_again_after_remove():
+    store = _build_store()
+    store.remove("/set/a/geo")
+    store.set("/set/a/geo", 7, None, None, "|set|a|geo")
+    assert store.aggregate(store.column("polygons"))[store.get_node("/set")] == 67
+    assert store.get_node_maya_obj_names(store.get_node("/set/a")) == ["|set|a|geo"]
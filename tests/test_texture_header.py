@@ -0,0 +1,112 @@
+import struct
+
+from renderer_diagnosis.TextureHeader import read_texture_header, expand_texture_path, estimate_texture_memory
+
+
+# ######################################################################################################################
+
+def _write_tiff(path, sizes, channels=3, bit_depth=8, tiled=True):
+    """
+    Write a little endian TIFF with only the IFDs, one per mip level, chained one after the other
+    :param path
+    :param sizes: (width, height) of each level
+    :param channels
+    :param bit_depth
+    :param tiled: whether the tile width tag is written
+    :return:
+    """
+    tags = [(256, 4), (257, 4), (258, 3), (277, 3)] + ([(322, 3)] if tiled else [])
+    ifd_size = 2 + len(tags) * 12 + 4
+    data = b"II*\0" + struct.pack("<I", 8)
+    for index, (width, height) in enumerate(sizes):
+        values = {256: width, 257: height, 258: bit_depth, 277: channels, 322: 64}
+        data += struct.pack("<H", len(tags))
+        for tag, value_type in tags:
+            packed = struct.pack("<H", values[tag]) + b"\0\0" if value_type == 3 else struct.pack("<I", values[tag])
+            data += struct.pack("<HHI", tag, value_type, 1) + packed
+        next_offset = 8 + (index + 1) * ifd_size if index + 1 < len(sizes) else 0
+        data += struct.pack("<I", next_offset)
+    with open(path, "wb") as tiff_file:
+        tiff_file.write(data)
+
+
+def _write_exr(path, width, height, level_mode=None):
+    """
+    Write the header of an EXR of half RGBA channels
+    :param path
+    :param width
+    :param height
+    :param level_mode: mode of the tiles (None if scanline)
+    :return:
+    """
+
+    def __attribute(name, attr_type, value):
+        return name.encode() + b"\0" + attr_type.encode() + b"\0" + struct.pack("<i", len(value)) + value
+
+    channels = b"".join(name.encode() + b"\0" + struct.pack("<iB3xii", 1, 0, 1, 1) for name in "ABGR") + b"\0"
+    version = 2 | (0x200 if level_mode is not None else 0)
+    data = struct.pack("<II", 20000630, version)
+    data += __attribute("channels", "chlist", channels)
+    data += __attribute("dataWindow", "box2i", struct.pack("<iiii", 0, 0, width - 1, height - 1))
+    if level_mode is not None:
+        data += __attribute("tiles", "tiledesc", struct.pack("<IIB", 64, 64, level_mode))
+    data += b"\0"
+    with open(path, "wb") as exr_file:
+        exr_file.write(data)
+
+
+def test_tx_mip_levels(tmp_path):
+    path = str(tmp_path / "albedo.tx")
+    _write_tiff(path, [(1024, 512), (512, 256), (256, 128), (128, 64)], channels=4, bit_depth=16)
+    header = read_texture_header(path)
+    assert header["format"] == "tiff"
+    assert header["mip_levels"] == 4
+    assert (header["width"], header["height"]) == (1024, 512)
+    assert header["channels"] == 4
+    assert header["bit_depth"] == 16
+    assert header["tiled"]
+    # The mip levels add a third of the full resolution
+    assert estimate_texture_memory(header) == 1024 * 512 * 4 * 2 * 4 / 3
+
+
+def test_tiff_single_level(tmp_path):
+    path = str(tmp_path / "albedo.tif")
+    _write_tiff(path, [(256, 256)], tiled=False)
+    header = read_texture_header(path)
+    assert header["mip_levels"] == 1
+    assert not header["tiled"]
+    assert estimate_texture_memory(header) == 256 * 256 * 3
+
+
+def test_exr_header(tmp_path):
+    scanline_path = str(tmp_path / "scanline.exr")
+    _write_exr(scanline_path, 2048, 1024)
+    header = read_texture_header(scanline_path)
+    assert header["format"] == "exr"
+    assert (header["width"], header["height"]) == (2048, 1024)
+    assert header["channels"] == 4
+    assert header["bit_depth"] == 16
+    assert not header["tiled"]
+    assert header["mip_levels"] == 1
+
+    mipmapped_path = str(tmp_path / "mipmapped.exr")
+    _write_exr(mipmapped_path, 2048, 1024, level_mode=1)
+    header = read_texture_header(mipmapped_path)
+    assert header["tiled"]
+    assert header["mip_levels"] == 12
+
+
+def test_other_format(tmp_path):
+    path = str(tmp_path / "albedo.png")
+    with open(path, "wb") as png_file:
+        png_file.write(b"\x89PNG\r\n\x1a\n")
+    assert read_texture_header(path) is None
+    assert read_texture_header(path, lambda other_path: {"format": "png"}) == {"format": "png"}
+    assert read_texture_header(str(tmp_path / "missing.tx")) is None
+
+
+def test_expand_udim(tmp_path):
+    for name in ["albedo.1001.tx", "albedo.1002.tx", "albedo.10003.tx", "albedo.mask.tx"]:
+        (tmp_path / name).write_bytes(b"")
+    pattern = str(tmp_path / "albedo.<UDIM>.tx").replace("\\", "/")
+    assert [path.rsplit("/", 1)[1] for path in expand_texture_path(pattern)] == ["albedo.1001.tx", "albedo.1002.tx"]